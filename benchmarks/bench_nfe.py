@@ -0,0 +1,196 @@
+"""Benchmark da ingestão de NF-e (pages/03_update_xml.py) com notas sintéticas.
+
+Mede cada etapa separadamente: leitura dos XML, normalização, categorização CFOP, enriquecimento,
+índice de busca e exportação Excel, com linhas/s e pico de memória por etapa, e compara com uma baseline.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.bench_nfe --invoices 2000 --items 1 15
+    python -m benchmarks.bench_nfe --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_nfe --baseline benchmarks/baseline.json
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.nfe_synthetic import SyntheticCatalog, synthetic_batch
+from utils.nfe_enrich import enrich_nfe
+from utils.nfe_normalize import categorize_nfe, normalize_nfe
+from utils.nfe_xml import ReadXML, resolve_backend
+from utils.export import export_dataframe
+from utils.search import SearchIndex
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ['leitura', 'normalização', 'categorização', 'enriquecimento', 'índice de busca', 'exportação excel']
+
+class NamedBytes(io.BytesIO):
+    """Arquivo em memória com nome, como os UploadedFile do Streamlit."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+def pipeline(batch, references, workers=1, backend='auto'):
+    """Gera (etapa, função) na ordem da página; cada função recebe a saída da etapa anterior."""
+    polars_po, polars_cod_project, polars_cat = references
+    return [
+        ('leitura', lambda _: ReadXML([NamedBytes(data, name) for name, data in batch],
+                                      workers=workers, backend=backend).process_xml_files().to_pandas()),
+        ('normalização', normalize_nfe),
+        ('categorização', categorize_nfe),
+        ('enriquecimento', lambda df: enrich_nfe(df, polars_po, polars_cod_project, polars_cat)),
+        ('índice de busca', lambda df: (SearchIndex(df), df)[1]),
+        ('exportação excel', lambda df: (export_dataframe(df, 'xlsx', sheet_name='Invoices'), df)[1]),
+    ]
+
+def peak_rss_mb():
+    """Pico de memória residente do processo (MB), quando disponível na plataforma."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+def run_once(batch, references, workers, backend, track_memory=False):
+    """Executa o pipeline uma vez; retorna {etapa: medidas} e o DataFrame final."""
+    results = {}
+    value = None
+    if track_memory:
+        tracemalloc.start()
+    for stage, func in pipeline(batch, references, workers, backend):
+        if track_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        value = func(value)
+        elapsed = time.perf_counter() - start
+        results[stage] = {'segundos': elapsed, 'linhas': len(value)}
+        if track_memory:
+            results[stage]['pico_python_mb'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    if track_memory:
+        tracemalloc.stop()
+    return results, value
+
+def result_digest(df):
+    """Assinatura do conteúdo do resultado final, para detectar mudanças de saída entre versões."""
+    return f"{int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFFFFFFFFFF:016x}"
+
+def benchmark(invoices=1000, items=(1, 10), text_size=40, seed=0, full=True, workers=1, backend='auto',
+              repeat=3, memory=True):
+    """Roda o benchmark completo: melhor tempo de `repeat` execuções por etapa e, opcionalmente, uma execução
+    adicional com tracemalloc para o pico de memória Python de cada etapa (fora da medição de tempo)."""
+    catalog = SyntheticCatalog(seed=seed, text_size=text_size)
+    batch = synthetic_batch(invoices, items, text_size, seed, full, catalog)
+    references = catalog.reference_tables()
+
+    runs = []
+    for _ in range(repeat):
+        timings, df = run_once(batch, references, workers, backend)
+        runs.append(timings)
+    stages = {}
+    for stage in STAGES:
+        seconds = min(run[stage]['segundos'] for run in runs)
+        rows = runs[0][stage]['linhas']
+        stages[stage] = {'segundos': round(seconds, 4), 'linhas': rows,
+                         'linhas_por_segundo': round(rows / seconds, 1) if seconds > 0 else None}
+    if memory:
+        memory_run, _ = run_once(batch, references, workers, backend, track_memory=True)
+        for stage in STAGES:
+            stages[stage]['pico_python_mb'] = round(memory_run[stage]['pico_python_mb'], 1)
+
+    return {
+        'parametros': {'invoices': invoices, 'items': list(items) if not isinstance(items, int) else items,
+                       'text_size': text_size, 'seed': seed, 'full': full, 'workers': workers,
+                       'backend': resolve_backend(backend)},
+        'repeticoes': repeat,
+        'ambiente': {'python': platform.python_version(), 'pandas': pd.__version__, 'plataforma': platform.platform()},
+        'xml_mb': round(sum(len(data) for _, data in batch) / 1024 / 1024, 2),
+        'etapas': stages,
+        'total_segundos': round(sum(stage['segundos'] for stage in stages.values()), 4),
+        'pico_rss_mb': peak_rss_mb(),
+        'resultado': {'linhas': len(df), 'colunas': len(df.columns), 'digest': result_digest(df)},
+    }
+
+def compare(result, baseline, tolerance=0.10):
+    """Compara com a baseline; retorna as linhas do relatório e se houve regressão acima de `tolerance`."""
+    lines = []
+    regression = False
+    if result['parametros'] != baseline.get('parametros'):
+        lines.append(f"Aviso: parâmetros diferentes da baseline ({baseline.get('parametros')})")
+    if result['resultado'] != baseline.get('resultado'):
+        lines.append(f"Aviso: resultado diferente da baseline ({baseline.get('resultado')} -> {result['resultado']})")
+    for stage in STAGES + ['total']:
+        if stage == 'total':
+            current, previous = result['total_segundos'], baseline.get('total_segundos')
+        else:
+            current = result['etapas'][stage]['segundos']
+            previous = baseline.get('etapas', {}).get(stage, {}).get('segundos')
+        if not previous:
+            continue
+        change = current / previous - 1
+        flag = ''
+        if change > tolerance:
+            flag = '  <- mais lento'
+            regression = True
+        elif change < -tolerance:
+            flag = '  <- mais rápido'
+        lines.append(f"{stage:<18} {previous:>9.3f}s -> {current:>9.3f}s  ({change:+.1%}){flag}")
+    return lines, regression
+
+def report(result):
+    lines = [f"{result['parametros']['invoices']} notas, {result['xml_mb']} MB de XML, "
+             f"backend {result['parametros']['backend']}, workers {result['parametros']['workers']}",
+             f"{'etapa':<18} {'segundos':>9} {'linhas':>9} {'linhas/s':>11} {'pico py MB':>11}"]
+    for stage, values in result['etapas'].items():
+        memory = values.get('pico_python_mb')
+        lines.append(f"{stage:<18} {values['segundos']:>9.3f} {values['linhas']:>9} "
+                     f"{values['linhas_por_segundo'] or 0:>11.0f} {'' if memory is None else memory:>11}")
+    lines.append(f"{'total':<18} {result['total_segundos']:>9.3f}")
+    if result['pico_rss_mb'] is not None:
+        lines.append(f"Pico de memória do processo: {result['pico_rss_mb']:.0f} MB")
+    lines.append(f"Resultado: {result['resultado']['linhas']} linhas, digest {result['resultado']['digest']}")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da ingestão de NF-e com notas sintéticas")
+    parser.add_argument('--invoices', type=int, default=1000, help="quantidade de notas")
+    parser.add_argument('--items', type=int, nargs='+', default=[1, 10],
+                        help="itens por nota: um número fixo ou mínimo e máximo")
+    parser.add_argument('--text-size', type=int, default=40, help="tamanho aproximado das descrições e informações adicionais")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--simple', action='store_true', help="notas sem impostos, assinatura e protocolo")
+    parser.add_argument('--workers', type=int, default=1, help="processos na leitura dos XML")
+    parser.add_argument('--backend', default='auto', help="parser dos XML: auto, lxml ou stdlib")
+    parser.add_argument('--repeat', type=int, default=3, help="execuções cronometradas (vale a melhor)")
+    parser.add_argument('--no-memory', action='store_true', help="não mede o pico de memória por etapa")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparação")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="variação tolerada antes de acusar regressão")
+    parser.add_argument('--save-baseline', help="grava o resultado desta execução como baseline")
+    parser.add_argument('--output', help="grava o resultado desta execução em JSON")
+    args = parser.parse_args(argv)
+
+    items = args.items[0] if len(args.items) == 1 else tuple(args.items[:2])
+    result = benchmark(args.invoices, items, args.text_size, args.seed, not args.simple, args.workers,
+                       args.backend, args.repeat, not args.no_memory)
+    print('\n'.join(report(result)))
+
+    regression = False
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            lines, regression = compare(result, json.load(f), args.tolerance)
+        print("\nComparação com a baseline:")
+        print('\n'.join(lines))
+    for path in filter(None, [args.save_baseline, args.output]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if regression else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Gerador determinístico de NF-e sintéticas para os benchmarks da ingestão de XML.
+
+Mesma semente e mesmos parâmetros geram exatamente os mesmos arquivos. As notas seguem o layout 4.00
+(ide, emit, dest, det com prod/imposto, total, transp, cobr, infAdic, assinatura e protocolo), com POs,
+elementos WBS e CFOPs que exercitam a extração de PO, a categorização e o enriquecimento.
+"""
+import random
+from xml.sax.saxutils import escape
+
+import polars as pl
+
+from utils.text import tag
+
+NFE_NAMESPACE = "http://www.portalfiscal.inf.br/nfe"
+
+CFOPS = ['5102', '6102', '5101', '6101', '5124', '5901', '5902', '5915', '5916', '5949', '6949', '1949', '2949', '5405']
+UNIDADES = ['UN', 'PC', 'KG', 'M', 'CJ', 'L']
+PALAVRAS = [
+    'parafuso', 'porca', 'arruela', 'sextavado', 'aço', 'inox', 'galvanizado', 'válvula', 'rolamento', 'flange',
+    'junta', 'vedação', 'mangueira', 'conexão', 'tubo', 'chapa', 'cantoneira', 'motor', 'redutor', 'acoplamento',
+    'bucha', 'eixo', 'engrenagem', 'filtro', 'óleo', 'graxa', 'luva', 'capacete', 'bota', 'óculos', 'serviço',
+    'usinagem', 'caldeiraria', 'pintura', 'montagem', 'manutenção', 'transporte', 'locação', 'guindaste', 'solda',
+]
+MUNICIPIOS = [('Curitiba', 'PR'), ('São Paulo', 'SP'), ('Porto Alegre', 'RS'), ('Belo Horizonte', 'MG'),
+              ('Joinville', 'SC'), ('Campinas', 'SP'), ('Três Lagoas', 'MS'), ('Imperatriz', 'MA')]
+
+ANDRITZ_NOME = 'ANDRITZ BRASIL LTDA'
+ANDRITZ_CNPJ = '00111222000133'
+
+def _texto(rng, tamanho):
+    """Texto com aproximadamente `tamanho` caracteres, formado por palavras do vocabulário."""
+    palavras = []
+    total = 0
+    while total < tamanho:
+        palavra = rng.choice(PALAVRAS)
+        palavras.append(palavra)
+        total += len(palavra) + 1
+    return ' '.join(palavras)
+
+class SyntheticCatalog:
+    """Fornecedores, materiais, POs e projetos compartilhados por todas as notas de um lote."""
+
+    def __init__(self, seed=0, suppliers=40, materials=500, pos=300, projects=25, text_size=40):
+        rng = random.Random(f"catalog:{seed}")
+        self.suppliers = [
+            (f"{10_000_000_000_000 + k * 7_919:014d}", f"FORNECEDOR {k} {rng.choice(PALAVRAS).upper()} LTDA",
+             rng.choice(MUNICIPIOS))
+            for k in range(suppliers)
+        ]
+        self.materials = [
+            (f"MAT{k:05d}", f"{_texto(rng, text_size)} {k}".upper(), rng.choice(UNIDADES), f"{rng.randint(1000, 9999)}{rng.randint(0, 9999):04d}")
+            for k in range(materials)
+        ]
+        self.projects = [(f"{100_000 + k * 37:06d}", f"PRJ-{k:03d} {rng.choice(PALAVRAS).upper()}") for k in range(projects)]
+        self.pos = [
+            (f"450{rng.randint(1, 6)}{rng.randint(0, 999_999):06d}", rng.choice(self.projects), f"CC{rng.randint(100, 999)}")
+            for _ in range(pos)
+        ]
+
+    def wbs(self, project_code, rng):
+        return f"A-BR-{project_code}-{rng.randint(0, 999):03d}-{rng.randint(0, 9999):04d}-{rng.randint(0, 999):03d}"
+
+    def reference_tables(self):
+        """Tabelas de referência no formato lido do MongoDB pela página (PO, projetos e categorias)."""
+        rng = random.Random("reference")
+        polars_po = pl.DataFrame({
+            'Purchasing Document': [int(po) for po, _, _ in self.pos],
+            'Project Code': [project[1] for _, project, _ in self.pos],
+            'Andritz WBS Element': [self.wbs(project[0], rng) for _, project, _ in self.pos],
+            'codigo_projeto': [int(project[0]) for _, project, _ in self.pos],
+            'Cost Center': [cost_center for _, _, cost_center in self.pos],
+        })
+        polars_cod_project = pl.DataFrame({
+            'codigo_projeto': [int(code) for code, _ in self.projects],
+            'Project Code': [name for _, name in self.projects],
+        })
+        # Categorias cadastradas para 60% dos materiais
+        cadastrados = self.materials[:int(len(self.materials) * 0.6)]
+        polars_cat = pl.DataFrame({
+            'tags': [tag(descricao).strip() for _, descricao, _, _ in cadastrados],
+            'grupo': [f"GRUPO {k % 12}" for k in range(len(cadastrados))],
+            'subgrupo': [f"SUBGRUPO {k % 40}" for k in range(len(cadastrados))],
+            'url_imagens': [f"https://example.com/img/{k}.jpg" for k in range(len(cadastrados))],
+        })
+        return polars_po, polars_cod_project, polars_cat
+
+IMPOSTO = (
+    "<imposto><vTotTrib>{trib}</vTotTrib><ICMS><ICMS00><orig>0</orig><CST>00</CST><modBC>3</modBC><vBC>{v}</vBC>"
+    "<pICMS>18.00</pICMS><vICMS>{icms}</vICMS></ICMS00></ICMS><IPI><cEnq>999</cEnq><IPITrib><CST>50</CST>"
+    "<vBC>{v}</vBC><pIPI>5.00</pIPI><vIPI>{ipi}</vIPI></IPITrib></IPI><PIS><PISAliq><CST>01</CST><vBC>{v}</vBC>"
+    "<pPIS>1.65</pPIS><vPIS>{pis}</vPIS></PISAliq></PIS><COFINS><COFINSAliq><CST>01</CST><vBC>{v}</vBC>"
+    "<pCOFINS>7.60</pCOFINS><vCOFINS>{cofins}</vCOFINS></COFINSAliq></COFINS></imposto>"
+)
+
+def _assinatura(rng):
+    return (
+        '<Signature xmlns="http://www.w3.org/2000/09/xmldsig#"><SignedInfo>'
+        '<CanonicalizationMethod Algorithm="http://www.w3.org/TR/2001/REC-xml-c14n-20010315"/>'
+        '<SignatureMethod Algorithm="http://www.w3.org/2000/09/xmldsig#rsa-sha1"/><Reference URI="">'
+        '<DigestMethod Algorithm="http://www.w3.org/2000/09/xmldsig#sha1"/>'
+        f'<DigestValue>{rng.getrandbits(160):040x}</DigestValue></Reference></SignedInfo>'
+        f'<SignatureValue>{rng.getrandbits(1024 * 2):0512x}</SignatureValue>'
+        f'<KeyInfo><X509Data><X509Certificate>{"MII" + "A" * 2400}</X509Certificate></X509Data></KeyInfo></Signature>'
+    )
+
+def synthetic_nfe(index, catalog, items=5, text_size=40, seed=0, full=True):
+    """Conteúdo (bytes) de uma NF-e sintética; `full` inclui impostos, assinatura e protocolo como nas notas reais."""
+    rng = random.Random(f"nfe:{seed}:{index}")
+    cnpj_emit, nome_emit, (municipio, uf) = rng.choice(catalog.suppliers)
+    if rng.random() < 0.05:
+        cnpj_emit, nome_emit = ANDRITZ_CNPJ, ANDRITZ_NOME
+    andritz_dest = rng.random() < 0.9
+    cnpj_dest, nome_dest = (ANDRITZ_CNPJ, ANDRITZ_NOME) if andritz_dest else (cnpj_emit, nome_emit)
+    po, project, _ = rng.choice(catalog.pos)
+    emissao = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(7, 18):02d}:{rng.randint(0, 59):02d}:00-03:00"
+    chave = f"41{emissao[2:4]}{emissao[5:7]}{cnpj_emit}55001{index:09d}1{rng.randint(0, 99_999_999):08d}"
+    chave += str(sum(int(d) for d in chave) % 10)
+
+    dets = []
+    total = 0.0
+    for n in range(1, items + 1):
+        codigo, descricao, unidade, ncm = rng.choice(catalog.materials)
+        quantidade = rng.randint(1, 500)
+        unitario = round(rng.uniform(0.5, 2000), 2)
+        valor = round(quantidade * unitario, 2)
+        total += valor
+        xped = f"<xPed>{po}</xPed><nItemPed>{n * 10}</nItemPed>" if rng.random() < 0.6 else ""
+        imposto = IMPOSTO.format(v=f"{valor:.2f}", trib=f"{valor * 0.3:.2f}", icms=f"{valor * 0.18:.2f}",
+                                 ipi=f"{valor * 0.05:.2f}", pis=f"{valor * 0.0165:.2f}", cofins=f"{valor * 0.076:.2f}") if full else ""
+        dets.append(
+            f'<det nItem="{n}"><prod><cProd>{codigo}</cProd><cEAN>SEM GTIN</cEAN><xProd>{escape(descricao)}</xProd>'
+            f'<NCM>{ncm}</NCM><CFOP>{rng.choice(CFOPS)}</CFOP><uCom>{unidade}</uCom><qCom>{quantidade:.4f}</qCom>'
+            f'<vUnCom>{unitario:.10f}</vUnCom><vProd>{valor:.2f}</vProd><cEANTrib>SEM GTIN</cEANTrib><uTrib>{unidade}</uTrib>'
+            f'<qTrib>{quantidade:.4f}</qTrib><vUnTrib>{unitario:.10f}</vUnTrib><indTot>1</indTot>{xped}</prod>{imposto}'
+            f'<infAdProd>{escape(_texto(rng, text_size // 2))}</infAdProd></det>'
+        )
+    frete = round(rng.uniform(0, 500), 2)
+    valor_nf = round(total + frete, 2)
+    duplicatas = ''.join(
+        f"<dup><nDup>{k:03d}</nDup><dVenc>2025-{k:02d}-{rng.randint(1, 28):02d}</dVenc><vDup>{valor_nf / 3:.2f}</vDup></dup>"
+        for k in range(1, rng.randint(1, 3) + 1)
+    )
+    info = f"PEDIDO {po} WBS {catalog.wbs(project[0], rng)} {_texto(rng, text_size)}"
+    xml = (
+        f'<?xml version="1.0" encoding="UTF-8"?><nfeProc xmlns="{NFE_NAMESPACE}" versao="4.00"><NFe>'
+        f'<infNFe Id="NFe{chave}" versao="4.00"><ide><cUF>41</cUF><cNF>{rng.randint(0, 99_999_999):08d}</cNF>'
+        f'<natOp>VENDA DE MERCADORIA</natOp><mod>55</mod><serie>1</serie><nNF>{index + 1}</nNF><dhEmi>{emissao}</dhEmi>'
+        f'<tpNF>1</tpNF><idDest>1</idDest></ide>'
+        f'<emit><CNPJ>{cnpj_emit}</CNPJ><xNome>{escape(nome_emit)}</xNome><enderEmit><xLgr>RUA {rng.randint(1, 999)}</xLgr>'
+        f'<nro>{rng.randint(1, 9999)}</nro><xBairro>CENTRO</xBairro><cMun>4106902</cMun><xMun>{municipio}</xMun><UF>{uf}</UF>'
+        f'<CEP>{rng.randint(10_000_000, 99_999_999)}</CEP><cPais>1058</cPais><xPais>BRASIL</xPais></enderEmit><IE>1234567890</IE></emit>'
+        f'<dest><CNPJ>{cnpj_dest}</CNPJ><xNome>{escape(nome_dest)}</xNome><enderDest><xLgr>AV DAS INDUSTRIAS</xLgr><nro>1000</nro>'
+        f'<xBairro>CIC</xBairro><cMun>4106902</cMun><xMun>Curitiba</xMun><UF>PR</UF><CEP>81000000</CEP><cPais>1058</cPais>'
+        f'<xPais>BRASIL</xPais></enderDest><indIEDest>1</indIEDest></dest>'
+        + ''.join(dets) +
+        f'<total><ICMSTot><vBC>{total:.2f}</vBC><vICMS>{total * 0.18:.2f}</vICMS><vProd>{total:.2f}</vProd>'
+        f'<vFrete>{frete:.2f}</vFrete><vNF>{valor_nf:.2f}</vNF></ICMSTot></total>'
+        f'<transp><modFrete>0</modFrete><vol><qVol>{rng.randint(1, 20)}</qVol><esp>VOLUME</esp></vol></transp>'
+        f'<cobr><fat><nFat>{index + 1}</nFat><vOrig>{valor_nf:.2f}</vOrig><vLiq>{valor_nf:.2f}</vLiq></fat>{duplicatas}</cobr>'
+        f'<compra><xPed>{po}</xPed></compra><infAdic><infCpl>{escape(info)}</infCpl></infAdic></infNFe>'
+        + (_assinatura(rng) if full else '') +
+        '</NFe>'
+        + (f'<protNFe versao="4.00"><infProt><tpAmb>1</tpAmb><chNFe>{chave}</chNFe><dhRecbto>{emissao}</dhRecbto>'
+           f'<nProt>1{rng.randint(0, 10 ** 14):015d}</nProt><cStat>100</cStat><xMotivo>Autorizado o uso da NF-e</xMotivo>'
+           '</infProt></protNFe>' if full else '') +
+        '</nfeProc>'
+    )
+    return xml.encode('utf-8')
+
+def synthetic_batch(invoices, items=(1, 10), text_size=40, seed=0, full=True, catalog=None):
+    """Lote de `invoices` notas como lista de (nome, bytes).
+
+    `items` é um número fixo de itens por nota ou um intervalo (mínimo, máximo) sorteado por nota.
+    """
+    catalog = catalog or SyntheticCatalog(seed=seed, text_size=text_size)
+    rng = random.Random(f"batch:{seed}")
+    batch = []
+    for index in range(invoices):
+        count = items if isinstance(items, int) else rng.randint(*items)
+        batch.append((f"nfe_{index:06d}.xml", synthetic_nfe(index, catalog, count, text_size, seed, full)))
+    return batch
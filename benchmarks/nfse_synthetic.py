@@ -0,0 +1,101 @@
+"""Gerador determinístico de PDFs de NFS-e sintéticas para os testes e benchmarks da extração de PDF.
+
+Os PDFs são montados à mão (texto Helvetica, WinAnsi, sem dependências) com os rótulos que os padrões de
+utils/nfse_pdf.FIELD_MAPPINGS procuram. Mesmo índice e mesma semente geram exatamente o mesmo arquivo.
+"""
+import random
+
+def _pdf(pages):
+    """Bytes de um PDF com uma página por lista de linhas de texto."""
+    objects = []
+    font = len(pages) * 2 + 3
+    kids = ' '.join(f'{3 + 2 * k} 0 R' for k in range(len(pages)))
+    objects.append(b'<< /Type /Catalog /Pages 2 0 R >>')
+    objects.append(f'<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>'.encode())
+    for k, lines in enumerate(pages):
+        content = [b'BT /F1 9 Tf 40 800 Td 11 TL']
+        for line in lines:
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            content.append(b'(' + escaped.encode('cp1252') + b') Tj T*')
+        content.append(b'ET')
+        stream = b'\n'.join(content)
+        objects.append(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {4 + 2 * k} 0 R '
+            f'/Resources << /Font << /F1 {font} 0 R >> >> >>'.encode()
+        )
+        objects.append(b'<< /Length ' + str(len(stream)).encode() + b' >>\nstream\n' + stream + b'\nendstream')
+    objects.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+    for offset in offsets:
+        out += f'{offset:010d} 00000 n \n'.encode()
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+    return bytes(out)
+
+def _brl(value):
+    return f'{value:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.')
+
+def synthetic_nfse_fields(index, seed=0):
+    """Valores esperados da extração (coluna de NFSE_FIELDS -> texto) da nota `index`."""
+    rng = random.Random(f"nfse:{seed}:{index}")
+    valor = rng.randint(100, 9_000_000) / 100
+    liquido = round(valor * 0.9, 2)
+    return {
+        "Numero NFS-e": str(1000 + index),
+        "Data Emissão": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024 {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+        "Competencia": "03/2024",
+        "Codigo de Verificacao": f"ABC{index:05d}",
+        "Numero RPS": str(500 + index),
+        "Razao Social Prestador": f"Prestadora {index % 17} Serviços Ltda",
+        "CNPJ Prestador": f"12.345.{index % 1000:03d}/0001-{index % 100:02d}",
+        "Discriminacao do Servico": (
+            f"Serviço de manutenção conforme PO 4502{rng.randint(100_000, 999_999)} "
+            f"projeto A-BC-{rng.randint(100_000, 999_999)}-001-2024-003"
+        ),
+        "Valor do Servico": _brl(valor),
+        "Retencao Federal": _brl(valor - liquido),
+        "Valor Liquido": _brl(liquido),
+    }
+
+def synthetic_nfse(index, annex_pages=0, seed=0):
+    """Conteúdo (bytes) do PDF da NFS-e `index`; `annex_pages` acrescenta páginas de anexo sem campos."""
+    fields = synthetic_nfse_fields(index, seed)
+    first_page = [
+        'PREFEITURA MUNICIPAL - NOTA FISCAL DE SERVIÇOS ELETRÔNICA',
+        f'Número da NFS-e: {fields["Numero NFS-e"]}',
+        f'Data e Hora da Emissão: {fields["Data Emissão"]}',
+        f'Competência: {fields["Competencia"]}',
+        f'Código de Verificação: {fields["Codigo de Verificacao"]}',
+        f'Número do RPS: {fields["Numero RPS"]}',
+        f'Razão Social/Nome: {fields["Razao Social Prestador"]}',
+        f'CNPJ/CPF: {fields["CNPJ Prestador"]}',
+        'Telefone: (11) 5555-1234',
+        f'E-mail: contato{index}@prestadora.com.br',
+        'Endereço e CEP: Rua das Flores 123 - 01000-000',
+        'Discriminação do Serviço',
+        fields["Discriminacao do Servico"],
+        'Código do Serviço / Atividade 07.02 - Execução de obras',
+        'Detalhamento Específico da Construção Civil Não se aplica',
+        'Código da Obra 123',
+        'Código ART 999',
+        'Tributos Federais PIS 0,65% COFINS 3%',
+        f'Valor do Serviço R$ {fields["Valor do Servico"]}',
+        'Desconto Incondicionado R$ 0,00',
+        'Desconto Condicionado R$ 0,00',
+        f'Retenções Federais R$ {fields["Retencao Federal"]}',
+        'ISSQN Retido R$ 0,00',
+        f'Valor Líquido R$ {fields["Valor Liquido"]}',
+        'Regime Especial Tributação Nenhum',
+        'Opção Simples Nacional Não',
+        'Incentivador Cultural Não',
+        'Avisos Documento emitido eletronicamente',
+    ]
+    annex = [[f'Anexo página {page + 1} linha {line} ' + 'texto de medição detalhada ' * 3 for line in range(65)]
+             for page in range(annex_pages)]
+    return _pdf([first_page] + annex)
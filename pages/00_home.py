@@ -5,9 +5,11 @@ import urllib.parse
 import unicodedata
 import re
 from bson.objectid import ObjectId
-import io
 import math
 
+from utils.br_format import format_number
+from utils.export import EXPORT_FORMATS, export_dataframe, export_file_name, export_mime
+
 def normalizar_string(texto):
     """
     Normaliza uma string removendo acentos, 
@@ -494,27 +496,6 @@ def exibir_pagina_dados(nome_colecao):
                 st.session_state[f'pagina_{nome_colecao}'] = total_paginas
                 st.rerun()
 
-    def formatar_numero(valor):
-        """
-        Formata números para exibição em padrão brasileiro
-        """
-        if pd.isna(valor):
-            return valor
-        
-        # Converte para float, tratando strings com vírgula
-        if isinstance(valor, str):
-            valor = float(valor.replace(',', ''))
-        
-        # Inteiros sem casas decimais
-        if isinstance(valor, (int, float)) and float(valor).is_integer():
-            return f'{int(valor):,}'.replace(',', '')
-        
-        # Decimais com duas casas
-        if isinstance(valor, (int, float)):
-            return f'{valor:.2f}'.replace('.', ',')
-        
-        return valor
-
     def renderizar_imagens(df):
         """
         Prepara colunas de imagens em um DataFrame
@@ -553,7 +534,7 @@ def exibir_pagina_dados(nome_colecao):
         # Aplicar formatação em cada coluna numérica
         df_formatado = df.copy()
         for coluna in df.select_dtypes(include=['int64', 'float64']).columns:
-            df_formatado[coluna] = df[coluna].apply(formatar_numero)
+            df_formatado[coluna] = format_number(df[coluna], na=None)
         
         # Renderizar imagens, se houver
         df_com_imagens = renderizar_imagens(df_formatado)
@@ -578,6 +559,13 @@ def exibir_pagina_dados(nome_colecao):
             column_config=column_config
         )
         
+        formato_download = st.selectbox(
+            "Formato do download",
+            list(EXPORT_FORMATS),
+            format_func=lambda formato: EXPORT_FORMATS[formato][0],
+            key=f"formato_{nome_colecao}"
+        )
+
         if st.button("📥 Baixar dados filtrados", key=f"download_{nome_colecao}"):
             texto_progresso = "Preparando download..."
             barra_progresso = st.progress(0, text=texto_progresso)
@@ -597,15 +585,11 @@ def exibir_pagina_dados(nome_colecao):
             
             df_completo = pd.concat(todos_dados, ignore_index=True)
             
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='xlsxwriter') as escritor:
-                df_completo.to_excel(escritor, index=False, sheet_name='Dados')
-            
             st.download_button(
-                label="💾 Clique para baixar Excel",
-                data=buffer.getvalue(),
-                file_name=f'{nome_colecao}_dados.xlsx',
-                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                label="💾 Clique para baixar",
+                data=export_dataframe(df_completo, formato_download),
+                file_name=export_file_name(f'{nome_colecao}_dados', formato_download),
+                mime=export_mime(formato_download)
             )
             
             barra_progresso.empty()
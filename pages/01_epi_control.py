@@ -5,10 +5,12 @@ import urllib.parse
 import unicodedata
 import re
 import math
-import io
 from bson.objectid import ObjectId
 import streamlit.components.v1 as components
 
+from utils.br_format import format_number
+from utils.export import EXPORT_FORMATS, export_dataframe, export_file_name, export_mime
+
 def normalize_string(texto):
     if not isinstance(texto, str):
         return str(texto)
@@ -362,36 +364,23 @@ def processar_urls(urls):
         return urls_validas[0] if urls_validas else None
     return None
 
-def formatar_valor(valor):
-    if isinstance(valor, pd.Series):
-        valor = valor.iloc[0]
-    if pd.isna(valor):
-        return '-'
-    if isinstance(valor, (int, float)):
-        # Remove decimal places if value is a whole number
-        if float(valor).is_integer():
-            return f'{int(valor):,}'.replace(',', '')
-        return f'{valor:.2f}'.replace('.', ',')
-    if isinstance(valor, str):
-        valor_limpo = valor.strip().replace(',', '.')
-        try:
-            valor_num = float(valor_limpo)
-            if float(valor_num).is_integer():
-                return f'{int(valor_num):,}'.replace(',', '')
-            return f'{valor_num:.2f}'.replace('.', ',')
-        except ValueError:
-            return str(valor)[:45]
-    return str(valor)[:45]
+def formatar_colunas(df, colunas):
+    """Texto exibido nos cartões para cada coluna, formatado de uma vez (colunas repetidas usam a primeira)."""
+    df = df.loc[:, ~df.columns.duplicated()]
+    textos = {col: format_number(df[col], max_chars=45) for col in colunas if col in df.columns}
+    return pd.DataFrame(textos, index=df.index)
 
 def renderizar_cartoes(df, colunas_visiveis, nome_colecao):
     colunas_imagem = [col for col in df.columns if 'url_imagens' in col.lower()]
     num_colunas = 5
+    textos = formatar_colunas(df, [col for col in colunas_visiveis if col not in colunas_imagem and col != '_id'])
     linhas = [df.iloc[i:i+num_colunas] for i in range(0, len(df), num_colunas)]
     
     for idx_linha, linha in enumerate(linhas):
         cols = st.columns(num_colunas)
+        textos_linha = textos.iloc[idx_linha * num_colunas:(idx_linha + 1) * num_colunas]
         
-        for idx_col, (_, registro) in enumerate(linha.iterrows()):
+        for idx_col, ((_, registro), (_, texto)) in enumerate(zip(linha.iterrows(), textos_linha.iterrows())):
             with cols[idx_col]:
                 url_imagem = None
                 for col_img in colunas_imagem:
@@ -402,7 +391,7 @@ def renderizar_cartoes(df, colunas_visiveis, nome_colecao):
 
                 detalhes_cartao = ''.join([
                     f'<div style="margin-bottom: 4px; font-size: 0.8rem;">'
-                    f'<strong>{col}:</strong> {formatar_valor(registro.get(col, "-"))}</div>'
+                    f'<strong>{col}:</strong> {texto.get(col, "-")}</div>'
                     for col in colunas_visiveis 
                     if col not in colunas_imagem and col != '_id'
                 ])
@@ -526,6 +515,13 @@ def exibir_pagina_dados(nome_colecao):
     if not df.empty and colunas_visiveis:
         renderizar_cartoes(df[colunas_visiveis + ['_id']], colunas_visiveis, nome_colecao)
         
+        formato_download = st.selectbox(
+            "Formato do download",
+            list(EXPORT_FORMATS),
+            format_func=lambda formato: EXPORT_FORMATS[formato][0],
+            key=f"formato_{nome_colecao}"
+        )
+
         if st.button("📥 Baixar dados filtrados", key=f"download_{nome_colecao}"):
             texto_progresso = "Preparando download..."
             barra_progresso = st.progress(0, text=texto_progresso)
@@ -545,15 +541,11 @@ def exibir_pagina_dados(nome_colecao):
             
             df_completo = pd.concat(todos_dados, ignore_index=True)
             
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                df_completo.to_excel(writer, index=False, sheet_name='Dados')
-            
             st.download_button(
-                label="💾 Clique para baixar Excel",
-                data=buffer.getvalue(),
-                file_name=f'{nome_colecao}_dados.xlsx',
-                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                label="💾 Clique para baixar",
+                data=export_dataframe(df_completo, formato_download),
+                file_name=export_file_name(f'{nome_colecao}_dados', formato_download),
+                mime=export_mime(formato_download)
             )
             
             barra_progresso.empty()
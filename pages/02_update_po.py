@@ -1,14 +1,24 @@
 import pandas as pd
 import streamlit as st
+import os
 import time
 from datetime import datetime
-import io
 import gc
 import logging
 from typing import List, Tuple, Optional, Dict, Any
 import numpy as np
-import base64
 import re
+import tempfile
+import urllib.parse
+from pymongo import MongoClient
+
+from utils.br_format import format_brl
+from utils.export import EXPORT_FORMATS, export_dataframe, export_file_name, export_mime
+from utils.po_cache import WorkbookCache
+from utils.po_delta import compute_delta, load_stored_hashes, upsert_delta
+from utils.po_excel import read_workbooks
+from utils.po_process import process_po
+from utils.po_schema import DATE_COLUMNS, apply_po_schema, concat_po
 
 # Desabilitar a exibição de separadores de milhar
 pd.options.display.float_format = '{:,.0f}'.format
@@ -23,6 +33,28 @@ MAX_UPLOAD_SIZE_MB = 200
 BYTES_PER_MB = 1024 * 1024
 CHUNK_SIZE = 10000
 
+# Collection das POs
+COLLECTION_PO = 'po'
+
+# Configuração só na execução pelo Streamlit: os processos do pool de leitura das planilhas (spawn)
+# importam este arquivo como __mp_main__ e não devem ler os secrets
+if __name__ == "__main__":
+    # Processos usados na leitura das planilhas (1 desativa o modo paralelo)
+    PO_WORKERS = int(st.secrets.get("PO_WORKERS", os.cpu_count() or 1))
+
+    # Leitor dos xlsx: 'auto' (calamine se instalado, senão openpyxl), 'calamine' ou 'openpyxl'
+    PO_EXCEL_ENGINE = st.secrets.get("PO_EXCEL_ENGINE", "auto")
+
+    # Processamento das POs: 'polars' (plano lazy em todos os núcleos) ou 'pandas' (processamento em blocos)
+    PO_ENGINE = st.secrets.get("PO_ENGINE", "polars")
+
+    # Cache em disco (Parquet) das planilhas já lidas, pelo conteúdo do arquivo; 0 MB desativa
+    PO_CACHE_DIR = st.secrets.get("PO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "po_cache"))
+    PO_CACHE_MB = int(st.secrets.get("PO_CACHE_MB", 2048))
+
+    # Lotes gravados em paralelo no MongoDB
+    MONGO_WRITE_WORKERS = int(st.secrets.get("MONGO_WRITE_WORKERS", 4))
+
 # Colunas selecionadas para salvar no arquivo final
 SELECTED_COLUMNS = [
     'Purchasing Document',
@@ -62,6 +94,26 @@ SELECTED_COLUMNS = [
     'unique'
 ]
 
+# Colunas calculadas em DataProcessor.process_dataframe
+COMPUTED_COLUMNS = {
+    'total_itens_po',
+    'codigo_projeto',
+    'PO Creation Date',
+    'valor_unitario',
+    'valor_item_com_impostos',
+    'total_valor_po_liquido',
+    'total_valor_po_com_impostos',
+    'valor_unitario_formatted',
+    'valor_item_com_impostos_formatted',
+    'Net order value_formatted',
+    'total_valor_po_liquido_formatted',
+    'total_valor_po_com_impostos_formatted',
+    'unique'
+}
+
+# Únicas colunas lidas das planilhas do SAP; as demais nunca chegam ao arquivo final
+INPUT_COLUMNS = [c for c in SELECTED_COLUMNS if c not in COMPUTED_COLUMNS]
+
 
 def extract_code(text: str) -> str:
     """
@@ -77,23 +129,6 @@ def extract_code(text: str) -> str:
 class DataProcessor:
     """Class to handle all data processing operations"""
 
-    @staticmethod
-    def format_currency(value: float) -> str:
-        """Format value as Brazilian currency"""
-        try:
-            if pd.isna(value) or value == '':
-                return "R$ 0,00"
-            if isinstance(value, str):
-                value = float(value.replace('.', '').replace(',', '.'))
-            value = float(value)
-            integer_part = int(value)
-            decimal_part = int(round((value - integer_part) * 100))
-            formatted_integer = '{:,}'.format(integer_part).replace(',', '.')
-            return f"R$ {formatted_integer},{decimal_part:02d}"
-        except Exception as e:
-            logger.warning(f"Error formatting currency value {value}: {str(e)}")
-            return "R$ 0,00"
-
     @staticmethod
     def safe_division(x: float, y: float) -> float:
         """Safely perform division handling zero division"""
@@ -132,6 +167,8 @@ class DataProcessor:
     @staticmethod
     def process_dataframe(df: pd.DataFrame, progress_bar: Any) -> pd.DataFrame:
         """Process the complete DataFrame with progress tracking"""
+        if PO_ENGINE == 'polars':
+            return DataProcessor.process_dataframe_polars(df, progress_bar)
         try:
             chunk_size = CHUNK_SIZE
             num_chunks = len(df) // chunk_size + 1
@@ -148,11 +185,7 @@ class DataProcessor:
 
             df_processed = pd.concat(processed_chunks, ignore_index=True)
 
-            # Eliminar linhas onde 'Purchasing Document' é string não numérica
-            df_processed = df_processed[
-                ~df_processed['Purchasing Document'].apply(lambda x: isinstance(x, str))
-            ]
-
+            # Linhas de rodapé e IDs já foram tratados na leitura (apply_po_schema)
             df_processed['unique'] = (
                 df_processed['Purchasing Document'].astype(str) +
                 df_processed['Item'].astype(str)
@@ -160,7 +193,8 @@ class DataProcessor:
 
             # Tratar coluna 'Supplier' com segurança — criar se não existir
             if 'Supplier' in df_processed.columns:
-                df_processed['Supplier'] = df_processed['Supplier'].astype(str)
+                if not isinstance(df_processed['Supplier'].dtype, pd.StringDtype):
+                    df_processed['Supplier'] = df_processed['Supplier'].astype(str)
             else:
                 logger.warning("Coluna 'Supplier' não encontrada. Criando coluna vazia.")
                 df_processed['Supplier'] = ''
@@ -172,7 +206,7 @@ class DataProcessor:
             df_processed['total_valor_po_com_impostos'] = df_processed.groupby(groupby_cols)['valor_item_com_impostos'].transform('sum')
             df_processed['total_itens_po'] = df_processed.groupby(groupby_cols)['Order Quantity'].transform('sum')
 
-            df_processed['PO Creation Date'] = pd.to_datetime(df_processed['Document Date'], dayfirst=True)
+            df_processed['PO Creation Date'] = df_processed['Document Date']
             df_processed = df_processed.sort_values(by='PO Creation Date', ascending=False)
 
             currency_columns = [
@@ -180,22 +214,11 @@ class DataProcessor:
                 'total_valor_po_liquido', 'total_valor_po_com_impostos'
             ]
             for col in currency_columns:
-                df_processed[f'{col}_formatted'] = df_processed[col].apply(DataProcessor.format_currency)
+                df_processed[f'{col}_formatted'] = format_brl(df_processed[col])
 
-            date_columns = [
-                'Document Date', 'Delivery date', 'Last FUP',
-                'Stat.-Rel. Del. Date', 'Delivery Date',
-                'Requisition Date', 'Inspection Request Date',
-                'First Delivery Date', 'Purchase Requisition Delivery Date'
-            ]
-            for col in date_columns:
+            # Datas já são datetime64 desde a leitura (formatos fixos em po_schema.DATE_FORMATS)
+            for col in DATE_COLUMNS:
                 if col in df_processed.columns:
-                    df_processed[col] = pd.to_datetime(
-                        df_processed[col],
-                        format='%d/%m/%Y',
-                        dayfirst=True,
-                        errors='coerce'
-                    )
                     df_processed[col] = df_processed[col].dt.strftime('%d/%m/%Y')
 
             # Usar a função extract_code definida no módulo (fora da classe)
@@ -207,18 +230,6 @@ class DataProcessor:
             else:
                 df_processed['codigo_projeto'] = ""
 
-            # Limpar colunas numéricas
-            columns_to_clean = ['Purchasing Document', 'Item', 'Material']
-            for col in columns_to_clean:
-                if col in df_processed.columns:
-                    df_processed[col] = (
-                        df_processed[col]
-                        .astype(str)
-                        .str.replace(r'\D', '', regex=True)
-                        .replace('', pd.NA)
-                        .astype(pd.Int64Dtype())
-                    )
-
             # Selecionar apenas colunas existentes no DataFrame
             cols_to_select = [c for c in SELECTED_COLUMNS if c in df_processed.columns]
             df_processed = df_processed[cols_to_select]
@@ -229,6 +240,20 @@ class DataProcessor:
             logger.error(f"Error in process_dataframe: {str(e)}")
             raise
 
+    @staticmethod
+    def process_dataframe_polars(df: pd.DataFrame, progress_bar: Any) -> pd.DataFrame:
+        """Same processing as the pandas path in a single Polars lazy plan (totals may differ in the last bit)"""
+        if 'Supplier' not in df.columns:
+            logger.warning("Coluna 'Supplier' não encontrada. Criando coluna vazia.")
+        try:
+            return process_po(
+                df, SELECTED_COLUMNS,
+                progress=lambda done, total, text: progress_bar.progress(done / total, text=text)
+            )
+        except Exception as e:
+            logger.error(f"Error in process_dataframe_polars: {str(e)}")
+            raise
+
 
 class FileHandler:
     """Class to handle file operations"""
@@ -239,23 +264,68 @@ class FileHandler:
         return sum(file.size for file in files) / BYTES_PER_MB
 
     @staticmethod
-    def to_excel(df: pd.DataFrame) -> str:
-        """Convert DataFrame to Excel file and return as base64 string"""
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False)
-        excel_data = output.getvalue()
-        b64 = base64.b64encode(excel_data).decode()
-        return b64
+    def export(df: pd.DataFrame, fmt: str = 'xlsx') -> bytes:
+        """Export DataFrame as file bytes (xlsx streamed in constant memory, csv or parquet)"""
+        options = {'sheet_name': 'Sheet1'} if fmt == 'xlsx' else {}
+        return export_dataframe(df, fmt, **options)
 
     @staticmethod
-    def read_excel_file(file: Any) -> Optional[pd.DataFrame]:
-        """Safely read Excel file"""
-        try:
-            return pd.read_excel(file, engine='openpyxl')
-        except Exception as e:
-            logger.error(f"Error reading file {file.name}: {str(e)}")
-            return None
+    def read_excel_files(files: List[Any], progress: Any = None) -> List[pd.DataFrame]:
+        """Read Excel files in parallel, parsing only INPUT_COLUMNS with the typed PO schema; unreadable or empty files are skipped"""
+        return read_workbooks(files, INPUT_COLUMNS, workers=PO_WORKERS, engine=PO_EXCEL_ENGINE, progress=progress,
+                              cache=get_workbook_cache(), prepare=apply_po_schema)
+
+
+@st.cache_resource
+def get_workbook_cache() -> Optional[WorkbookCache]:
+    """On-disk cache of parsed workbooks shared by all sessions (None when disabled or unavailable)"""
+    if PO_CACHE_MB <= 0:
+        return None
+    try:
+        return WorkbookCache(PO_CACHE_DIR, PO_CACHE_MB * BYTES_PER_MB)
+    except OSError as e:
+        logger.warning(f"Workbook cache disabled ({PO_CACHE_DIR}): {str(e)}")
+        return None
+
+
+def get_mongo_uri() -> str:
+    """MongoDB connection string from the app secrets"""
+    username = urllib.parse.quote_plus(st.secrets["MONGO_USERNAME"])
+    password = urllib.parse.quote_plus(st.secrets["MONGO_PASSWORD"])
+    return (f"mongodb+srv://{username}:{password}@{st.secrets['MONGO_CLUSTER']}/"
+            f"{st.secrets['MONGO_DB']}?retryWrites=true&w=majority")
+
+
+def save_to_database(df: pd.DataFrame, delta_only: bool = True) -> None:
+    """Upsert the processed POs into the 'po' collection, writing only new or changed rows in delta mode"""
+    progress_bar = st.progress(0.0, text="Comparando com o banco de dados...")
+    try:
+        with MongoClient(get_mongo_uri()) as client:
+            collection = client[st.secrets["MONGO_DB"]][COLLECTION_PO]
+            # Sem hashes gravados todas as linhas são regravadas (com o hash, para os próximos deltas)
+            stored = load_stored_hashes(collection) if delta_only else {}
+            delta = compute_delta(df, stored)
+            resumo = upsert_delta(
+                collection, delta, workers=MONGO_WRITE_WORKERS,
+                progress=lambda done, total: progress_bar.progress(done / total, text=f"Gravando: {done}/{total} itens")
+            )
+    except Exception as e:
+        progress_bar.empty()
+        logger.error(f"Error saving to database: {str(e)}")
+        st.error(f"❌ Erro ao gravar no MongoDB: {str(e)}")
+        return
+    progress_bar.empty()
+
+    st.success(
+        f"✅ Banco de dados atualizado: {resumo['inseridos']} itens novos, {resumo['atualizados']} alterados, "
+        f"{delta['inalterados'] + resumo['inalterados']} sem alteração"
+        + (f" ({delta['inalterados']} não regravados)" if delta['inalterados'] else "")
+        + (f", {delta['ignorados']} ignorados (sem chave ou repetidos)" if delta['ignorados'] else "")
+    )
+    if delta['removidos']:
+        with st.expander(f"⚠️ {len(delta['removidos'])} itens no banco não vieram nesta exportação"):
+            st.caption("Itens das POs exportadas que existem no banco mas não no arquivo; eles não são apagados.")
+            st.dataframe(pd.DataFrame({'unique': delta['removidos']}), hide_index=True)
 
 
 def clear_session_state():
@@ -265,28 +335,6 @@ def clear_session_state():
     gc.collect()
 
 
-def get_download_link(b64_data: str, filename: str) -> str:
-    """Generate HTML download link for Excel file"""
-    href = f'data:application/vnd.openxmlformats-officedocument.spreadsheetml.sheet;base64,{b64_data}'
-    return f'''
-        <a href="{href}"
-           download="{filename}"
-           class="downloadButton"
-           onclick="setTimeout(function(){{ window.location.href = window.location.pathname; }}, 1000);">
-           📥 Baixar Arquivo Excel Processado
-        </a>
-        <script>
-            window.addEventListener('load', function() {{
-                document.querySelector('.downloadButton').addEventListener('click', function() {{
-                    setTimeout(function() {{
-                        window.location.reload();
-                    }}, 1000);
-                }});
-            }});
-        </script>
-    '''
-
-
 def main():
     """Main application function"""
     st.set_page_config(
@@ -296,35 +344,12 @@ def main():
         initial_sidebar_state="collapsed"
     )
 
-    st.markdown("""
-        <style>
-        .downloadButton {
-            background-color: #0075be;
-            color: white !important;
-            padding: 0.5em 1em;
-            text-decoration: none;
-            border-radius: 5px;
-            border: none;
-            display: inline-block;
-            width: 100%;
-            text-align: center;
-            margin: 1em 0;
-            font-weight: 500;
-        }
-        .downloadButton:hover {
-            background-color: #4098ce;
-            color: white !important;
-            text-decoration: none;
-        }
-        </style>
-    """, unsafe_allow_html=True)
-
     if 'initialized' not in st.session_state:
         clear_session_state()
         st.session_state.initialized = True
         st.session_state.processed_data = None
         st.session_state.download_filename = None
-        st.session_state.excel_data = None
+        st.session_state.exports = {}
         st.session_state.download_triggered = False
         st.session_state.df_view = None  # DataFrame para visualização
 
@@ -358,22 +383,21 @@ def main():
                         status_placeholder = st.empty()
 
                         start_time = time.time()
-                        all_dfs = []
 
-                        for idx, uploaded_file in enumerate(uploaded_files):
-                            status_placeholder.info(f"Processando: {uploaded_file.name}")
-                            df_temp = FileHandler.read_excel_file(uploaded_file)
-                            if df_temp is not None and not df_temp.empty:
-                                all_dfs.append(df_temp)
-                            progress_bar.progress((idx + 1) / len(uploaded_files))
+                        def file_read(done, total, name):
+                            status_placeholder.info(f"Lido: {name} ({done}/{total})")
+                            progress_bar.progress(done / total)
+
+                        status_placeholder.info(f"Lendo {len(uploaded_files)} arquivo(s)...")
+                        all_dfs = FileHandler.read_excel_files(uploaded_files, progress=file_read)
 
                         if all_dfs:
-                            df_final = pd.concat(all_dfs, ignore_index=True)
+                            df_final = concat_po(all_dfs)
                             df_processed = DataProcessor.process_dataframe(df_final, progress_bar)
 
                             st.session_state.processed_data = df_processed
-                            st.session_state.download_filename = f"PO_{randon}.xlsx"
-                            st.session_state.excel_data = FileHandler.to_excel(df_processed)
+                            st.session_state.download_filename = f"PO_{randon}"
+                            st.session_state.exports = {}
 
                             # Preparar DataFrame para visualização
                             view_cols = [
@@ -385,23 +409,13 @@ def main():
                             ]
                             available_view_cols = [c for c in view_cols if c in df_processed.columns]
                             df_view = df_processed[available_view_cols].copy()
+                            # IDs já são Int64 desde a leitura (po_schema): unique = dígitos da PO seguidos dos do item
                             df_view['unique'] = (
-                                df_view['Purchasing Document'].astype(str) +
-                                df_view['Item'].astype(str)
-                            )
+                                df_view['Purchasing Document'].astype('string') +
+                                df_view['Item'].astype('string').fillna('')
+                            ).astype('Int64')
                             df_view = df_view.drop_duplicates(subset=['unique'])
 
-                            clean_cols = ['unique', 'Purchasing Document', 'Item', 'Material']
-                            for col in clean_cols:
-                                if col in df_view.columns:
-                                    df_view[col] = (
-                                        df_view[col]
-                                        .astype(str)
-                                        .str.replace(r'\D', '', regex=True)
-                                        .replace('', pd.NA)
-                                        .astype(pd.Int64Dtype())
-                                    )
-
                             st.session_state.df_view = df_view
 
                             elapsed_time = time.time() - start_time
@@ -420,13 +434,37 @@ def main():
                     logger.error(f"Error during processing: {str(e)}")
                     st.error(f"❌ Erro durante o processamento: {str(e)}")
 
-        if st.session_state.excel_data is not None:
+        if st.session_state.processed_data is not None:
             st.subheader("📥 Download do Arquivo Processado")
-            download_link = get_download_link(
-                st.session_state.excel_data,
-                st.session_state.download_filename
+            export_format = st.selectbox(
+                "Formato do arquivo",
+                list(EXPORT_FORMATS),
+                format_func=lambda fmt: EXPORT_FORMATS[fmt][0],
+                help="CSV e Parquet são gerados mais rápido que o Excel em arquivos grandes"
+            )
+            # Cada formato é gerado uma única vez por processamento (o Streamlit reexecuta a página a cada clique)
+            if export_format not in st.session_state.exports:
+                with st.spinner("Gerando arquivo..."):
+                    st.session_state.exports[export_format] = FileHandler.export(
+                        st.session_state.processed_data, export_format
+                    )
+            st.download_button(
+                label="📥 Baixar Arquivo Processado",
+                data=st.session_state.exports[export_format],
+                file_name=export_file_name(st.session_state.download_filename, export_format),
+                mime=export_mime(export_format),
+                use_container_width=True,
+                type="primary"
             )
-            st.markdown(download_link, unsafe_allow_html=True)
+
+            st.subheader("💾 Gravar no Banco de Dados")
+            delta_only = st.checkbox(
+                "Gravar somente itens novos ou alterados", value=True,
+                help="Compara o hash de cada item (chave 'unique') com o gravado na collection 'po'; "
+                     "desmarcado, regrava todos os itens"
+            )
+            if st.button("💾 Gravar na collection 'po'", use_container_width=True):
+                save_to_database(st.session_state.processed_data, delta_only)
 
             if st.button("🔄 Limpar e Voltar ao Início", use_container_width=True):
                 clear_session_state()
@@ -487,7 +525,7 @@ def main():
            - 200MB no total
 
         3. **Dados processados são salvos?**
-           - Não, os dados são processados apenas durante a sessão atual
+           - Somente ao clicar em "Gravar na collection 'po'"; por padrão só itens novos ou alterados são gravados
         """)
 
 
@@ -498,13 +536,13 @@ if __name__ == "__main__":
         logger.error(f"Application error: {str(e)}")
         st.error("Ocorreu um erro inesperado. Por favor, tente novamente.")
 
-# Footer
-st.markdown("---")
-st.markdown(
-    """
-    <div style='text-align: center'>
-        <p>Desenvolvido com ❤️ | PO Processor Pro v1.0</p>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
+    # Footer
+    st.markdown("---")
+    st.markdown(
+        """
+        <div style='text-align: center'>
+            <p>Desenvolvido com ❤️ | PO Processor Pro v1.0</p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
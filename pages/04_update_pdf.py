@@ -1,167 +1,25 @@
 import streamlit as st
 import pandas as pd
-import pdfplumber
 import re
 import os
 from datetime import datetime
-import base64
-from io import BytesIO
-import tempfile
-import unicodedata
 
-# Field mapping dictionary to handle different variations
-FIELD_MAPPINGS = {
-    "numero_nf": [
-        r"NFS-e\s*:?\s*([\d]+)",
-        r"Número da\s*NFS-e\s*:?\s*([\d]+)",
-        r"Nº da Nota\s*:?\s*([\d]+)",
-        r"Número\s*:?\s*([\d]+)"
-    ],
-    "data_emissao": [
-        r"Data e Hora da Emissão\s*:?\s*([\d]{1,2}/[\d]{1,2}/[\d]{4}\s+\d{1,2}:\d{2})",
-        r"Emissão da NFS-e\s*:?\s*([\d]{1,2}/[\d]{1,2}/[\d]{4}\s+\d{1,2}:\d{2})",
-        r"Data de Emissão\s*:?\s*([\d]{1,2}/[\d]{1,2}/[\d]{4}\s+\d{1,2}:\d{2})"
-    ],
-    "competencia": [
-        r"Competência\s*:?\s*([^\n]+)",
-        r"Mês de Competência\s*:?\s*([^\n]+)",
-        r"Período de Competência\s*:?\s*([^\n]+)"
-    ],
-    "codigo_verificacao": [
-        r"Código de Verificação\s*:?\s*([^\n]+)",
-        r"Código Verificador\s*:?\s*([^\n]+)",
-        r"Código de Autenticidade\s*:?\s*([^\n]+)"
-    ],
-    "numero_rps": [
-        r"Número do RPS\s*:?\s*([\d]+)",
-        r"RPS Nº\s*:?\s*([\d]+)"
-    ],
-    "nf_substituida": [
-        r"No\. da NFS-e substituída\s*:?\s*([\d]+)",
-        r"NFS-e substituída\s*:?\s*([\d]+)"
-    ],
-    "prestador_nome": [
-        r"Razão Social/Nome\s*:?\s*([^\n]+)",
-        r"Nome/Razão Social\s*:?\s*([^\n]+)",
-        r"Prestador de Serviço\s*:?\s*([^\n]+)"
-    ],
-    "prestador_cnpj": [
-        r"CNPJ/CPF\s*:?\s*([\d\.\-/]+)",
-        r"CPF/CNPJ\s*:?\s*([\d\.\-/]+)",
-        r"CNPJ\s*:?\s*([\d\.\-/]+)"
-    ],
-    "prestador_telefone": [
-        r"Telefone\s*:?\s*([\d\(\)\s\-]+)",
-        r"Fone\s*:?\s*([\d\(\)\s\-]+)",
-        r"Tel\s*:?\s*([\d\(\)\s\-]+)"
-    ],
-    "prestador_email": [
-        r"e-mail\s*:?\s*([\w\.\-]+@[\w\.\-]+)",
-        r"E-mail\s*:?\s*([\w\.\-]+@[\w\.\-]+)",
-        r"Email\s*:?\s*([\w\.\-]+@[\w\.\-]+)"
-    ],
-    "tomador_nome": [
-        r"Tomador de Serviço\s*Razão Social/Nome\s*:?\s*([^\n]+)",
-        r"Nome/Razão Social do Tomador\s*:?\s*([^\n]+)",
-        r"Tomador\s*:?\s*([^\n]+)"
-    ],
-    "tomador_cnpj": [
-        r"CNPJ/CPF do Tomador\s*:?\s*([\d\.\-/]+)",
-        r"CPF/CNPJ do Tomador\s*:?\s*([\d\.\-/]+)",
-        r"CNPJ Tomador\s*:?\s*([\d\.\-/]+)"
-    ],
-    "tomador_endereco": [
-        r"Endereço e CEP\s*:?\s*([^\n]+)",
-        r"Endereço Tomador\s*:?\s*([^\n]+)"
-    ],
-    "tomador_telefone": [
-        r"Telefone Tomador\s*:?\s*([\d\(\)\s\-]+)",
-        r"Fone Tomador\s*:?\s*([\d\(\)\s\-]+)"
-    ],
-    "tomador_email": [
-        r"e-mail Tomador\s*:?\s*([\w\.\-]+@[\w\.\-]+)",
-        r"Email Tomador\s*:?\s*([\w\.\-]+@[\w\.\-]+)"
-    ],
-    "discriminacao_servico": [
-        r"Discriminação (do|dos) Serviço(s)?\s*(.+?)(?=Código do Serviço|Detalhamento Específico|Tributos Federais|Valor do Serviço)",
-        r"Descrição dos Serviços\s*(.+?)(?=Código|Valor|Tributos)",
-        r"Descrição\s*(.+?)(?=Código|Valor|Tributos)"
-    ],
-    "codigo_servico": [
-        r"Código do Serviço\s*/\s*Atividade\s*([^\n]+)",
-        r"Código Serviço\s*:?\s*([^\n]+)"
-    ],
-    "detalhamento_especifico": [
-        r"Detalhamento Específico da Construção Civil\s*([^\n]+)",
-        r"Detalhamento Específico\s*:?\s*([^\n]+)"
-    ],
-    "codigo_obra": [
-        r"Código da Obra\s*([^\n]+)",
-        r"Código Obra\s*:?\s*([^\n]+)"
-    ],
-    "codigo_art": [
-        r"Código ART\s*([^\n]+)",
-        r"ART\s*:?\s*([^\n]+)"
-    ],
-    "tributos_federais": [
-        r"Tributos Federais\s*([^\n]+)",
-        r"Tributos Fed\.\s*:?\s*([^\n]+)"
-    ],
-    "valor_servico": [
-        r"Valor (do|dos) Serviço(s)?\s*R\$\s*([\d\.,]+)",
-        r"Valor Total\s*R\$\s*([\d\.,]+)",
-        r"Total da Nota\s*R\$\s*([\d\.,]+)",
-        r"Valor do Serviço\s*[\r\n]+\s*([\d\.,]+)",  # New pattern for your PDF format
-        r"Valor do Serviço\s*([\d\.,]+)"  # Alternative pattern without newline
-    ],
-    "desconto_incondicionado": [
-        r"Desconto Incondicionado\s*R\$\s*([\d\.,]+)",
-        r"Desc\. Incond\.\s*R\$\s*([\d\.,]+)"
-    ],
-    "desconto_condicionado": [
-        r"Desconto Condicionado\s*R\$\s*([\d\.,]+)",
-        r"Desc\. Cond\.\s*R\$\s*([\d\.,]+)"
-    ],
-    "retencao_federal": [
-        r"Retenções Federais\s*R\$\s*([\d\.,]+)",
-        r"Ret\. Federais\s*R\$\s*([\d\.,]+)"
-    ],
-    "issqn_retido": [
-        r"ISSQN Retido\s*R\$\s*([\d\.,]+)",
-        r"ISS Retido\s*R\$\s*([\d\.,]+)"
-    ],
-    "valor_liquido": [
-        r"Valor Líquido\s*R\$\s*([\d\.,]+)",
-        r"Líquido\s*R\$\s*([\d\.,]+)"
-    ],
-    "regime_tributacao": [
-        r"Regime Especial Tributação\s*([^\n]+)",
-        r"Regime Tributário\s*:?\s*([^\n]+)"
-    ],
-    "simples_nacional": [
-        r"Opção Simples Nacional\s*([^\n]+)",
-        r"Simples Nacional\s*:?\s*([^\n]+)"
-    ],
-    "incentivador_cultural": [
-        r"Incentivador Cultural\s*([^\n]+)",
-        r"Inc\. Cultural\s*:?\s*([^\n]+)"
-    ],
-    "avisos": [
-        r"Avisos\s*([^\n]+)",
-        r"Observações\s*:?\s*([^\n]+)"
-    ]
-}
+from utils.br_format import format_brl, parse_number
+from utils.export import export_dataframe, export_mime
+from utils.nfse_pdf import read_nfse_pdfs
+from utils.text import slugify_series
 
-def extract_field(text, field_key):
-    """Extract field value using multiple possible patterns"""
-    if not text:
-        return None
-    patterns = FIELD_MAPPINGS.get(field_key, [])
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-        if match:
-            return match.group(match.lastindex).strip()
-    return None
+# Configuração só na execução pelo Streamlit: os processos do pool de extração dos PDFs (spawn)
+# importam este arquivo como __mp_main__ e não devem ler os secrets
+if __name__ == "__main__":
+    # Processos usados na extração dos PDFs (1 desativa o modo paralelo)
+    NFSE_WORKERS = int(st.secrets.get("NFSE_WORKERS", os.cpu_count() or 1))
+
+    # Limite de tempo (segundos) da extração de cada PDF
+    NFSE_TIMEOUT = int(st.secrets.get("NFSE_TIMEOUT", 60))
+
+    # Leitor do texto dos PDFs: 'pdfplumber' (padrão), 'pdfium' ou 'auto' (pypdfium2 se instalado)
+    NFSE_PDF_BACKEND = st.secrets.get("NFSE_PDF_BACKEND", "pdfplumber")
 
 def extract_numbers(text):
     """Extract numbers starting with 4501-4506"""
@@ -181,124 +39,9 @@ def extract_code(text):
     match = re.search(pattern, text)
     return match.group(1) if match else ""
 
-def slugify(text):
-    """Convert text to slug format"""
-    if not isinstance(text, str):
-        text = str(text)
-    text = text.lower()
-    text = unicodedata.normalize('NFKD', text)
-    text = text.encode('ascii', 'ignore').decode('utf-8')
-    text = re.sub(r'[^a-z0-9]+', '-', text)
-    text = text.strip('-')
-    text = re.sub(r'-+', '-', text)
-    return text
-
-def convert_brazilian_number(value):
-    """Convert Brazilian number format to float"""
-    if pd.isna(value) or value is None:
-        return 0.0
-    try:
-        clean_value = str(value).replace('.', '').replace(',', '.')
-        return float(clean_value)
-    except (ValueError, AttributeError):
-        return 0.0
-
 def to_excel(df):
-    """Convert dataframe to excel file and encode it for download"""
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False)
-    excel_data = output.getvalue()
-    return base64.b64encode(excel_data).decode('utf-8')
-
-def extrair_dados_nf(pdf_file):
-    """Extract data from NF PDF"""
-    dados_nf = {
-        "Numero NFS-e": None,
-        "Data Emissão": None,
-        "Competencia": None,
-        "Codigo de Verificacao": None,
-        "Numero RPS": None,
-        "NF-e Substituida": None,
-        "Razao Social Prestador": None,
-        "CNPJ Prestador": None,
-        "Telefone Prestador": None,
-        "Email Prestador": None,
-        "Razao Social Tomador": None,
-        "CNPJ Tomador": None,
-        "Endereco Tomador": None,
-        "Telefone Tomador": None,
-        "Email Tomador": None,
-        "Discriminacao do Servico": None,
-        "Codigo Servico": None,
-        "Detalhamento Especifico": None,
-        "Codigo da Obra": None,
-        "Codigo ART": None,
-        "Tributos Federais": None,
-        "Valor do Servico": None,
-        "Desconto Incondicionado": None,
-        "Desconto Condicionado": None,
-        "Retencao Federal": None,
-        "ISSQN Retido": None,
-        "Valor Liquido": None,
-        "Regime Especial Tributacao": None,
-        "Simples Nacional": None,
-        "Incentivador Cultural": None,
-        "Avisos": None,
-        "Nome do Arquivo": pdf_file.name,
-    }
-
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(pdf_file.getvalue())
-        tmp_file_path = tmp_file.name
-
-    try:
-        with pdfplumber.open(tmp_file_path) as pdf:
-            text = ""
-            for page in pdf.pages:
-                text += page.extract_text() or ""
-            
-            if not text:
-                st.warning(f"Falha ao extrair texto do PDF: {pdf_file.name}")
-                return dados_nf
-
-            # Extract all fields using mapping
-            dados_nf["Numero NFS-e"] = extract_field(text, "numero_nf")
-            dados_nf["Data Emissão"] = extract_field(text, "data_emissao")
-            dados_nf["Competencia"] = extract_field(text, "competencia")
-            dados_nf["Codigo de Verificacao"] = extract_field(text, "codigo_verificacao")
-            dados_nf["Numero RPS"] = extract_field(text, "numero_rps")
-            dados_nf["NF-e Substituida"] = extract_field(text, "nf_substituida")
-            dados_nf["Razao Social Prestador"] = extract_field(text, "prestador_nome")
-            dados_nf["CNPJ Prestador"] = extract_field(text, "prestador_cnpj")
-            dados_nf["Telefone Prestador"] = extract_field(text, "prestador_telefone")
-            dados_nf["Email Prestador"] = extract_field(text, "prestador_email")
-            dados_nf["Razao Social Tomador"] = extract_field(text, "tomador_nome")
-            dados_nf["CNPJ Tomador"] = extract_field(text, "tomador_cnpj")
-            dados_nf["Endereco Tomador"] = extract_field(text, "tomador_endereco")
-            dados_nf["Telefone Tomador"] = extract_field(text, "tomador_telefone")
-            dados_nf["Email Tomador"] = extract_field(text, "tomador_email")
-            dados_nf["Discriminacao do Servico"] = extract_field(text, "discriminacao_servico")
-            dados_nf["Codigo Servico"] = extract_field(text, "codigo_servico")
-            dados_nf["Detalhamento Especifico"] = extract_field(text, "detalhamento_especifico")
-            dados_nf["Codigo da Obra"] = extract_field(text, "codigo_obra")
-            dados_nf["Codigo ART"] = extract_field(text, "codigo_art")
-            dados_nf["Tributos Federais"] = extract_field(text, "tributos_federais")
-            dados_nf["Valor do Servico"] = extract_field(text, "valor_servico")
-            dados_nf["Desconto Incondicionado"] = extract_field(text, "desconto_incondicionado")
-            dados_nf["Desconto Condicionado"] = extract_field(text, "desconto_condicionado")
-            dados_nf["Retencao Federal"] = extract_field(text, "retencao_federal")
-            dados_nf["ISSQN Retido"] = extract_field(text, "issqn_retido")
-            dados_nf["Valor Liquido"] = extract_field(text, "valor_liquido")
-            dados_nf["Regime Especial Tributacao"] = extract_field(text, "regime_tributacao")
-            dados_nf["Simples Nacional"] = extract_field(text, "simples_nacional")
-            dados_nf["Incentivador Cultural"] = extract_field(text, "incentivador_cultural")
-            dados_nf["Avisos"] = extract_field(text, "avisos")
-
-    finally:
-        os.unlink(tmp_file_path)
-
-    return dados_nf
+    """Convert dataframe to excel file bytes for download"""
+    return export_dataframe(df, 'xlsx', sheet_name='Sheet1')
 
 def main():
     st.set_page_config(
@@ -359,19 +102,19 @@ def main():
 
         if uploaded_files:
             with st.spinner('Processando os arquivos...'):
-                dados_extraidos = []
                 progress_bar = st.progress(0)
-                
-                for i, pdf_file in enumerate(uploaded_files):
-                    dados_nf = extrair_dados_nf(pdf_file)
-                    dados_extraidos.append(dados_nf)
-                    progress_bar.progress((i + 1) / len(uploaded_files))
+                dados_extraidos, erros = read_nfse_pdfs(
+                    uploaded_files, workers=NFSE_WORKERS, timeout=NFSE_TIMEOUT, backend=NFSE_PDF_BACKEND,
+                    progress=lambda lidos, total, nome: progress_bar.progress(lidos / total),
+                )
+                for nome, erro in erros:
+                    st.warning(f"Falha ao extrair dados do PDF {nome}: {erro}")
                 
                 df_nf = pd.DataFrame(dados_extraidos)
                 
                 # Create unique identifier and remove duplicates
                 df_nf['unique'] = df_nf['Numero NFS-e'].astype(str) + '-' + df_nf['CNPJ Prestador'].astype(str)
-                df_nf['unique'] = df_nf['unique'].apply(slugify)
+                df_nf['unique'] = slugify_series(df_nf['unique'])
                 df_nf.drop_duplicates(subset='unique', inplace=True)
                 
                 # Extract PO numbers and project codes
@@ -404,9 +147,9 @@ def main():
                 excel_file = to_excel(df_nf)
                 st.download_button(
                     label="📥 Baixar Excel",
-                    data=base64.b64decode(excel_file),
+                    data=excel_file,
                     file_name=f'nfspdf_{randon}.xlsx',
-                    mime="application/vnd.ms-excel"
+                    mime=export_mime('xlsx')
                 )
 
     with tabs[1]:
@@ -448,12 +191,12 @@ def main():
                     st.metric("Total de NFs", len(df_filtered))
                 with met_col2:
                     if 'Valor do Servico' in df_filtered.columns:
-                        total_valor = df_filtered['Valor do Servico'].apply(convert_brazilian_number).sum()
-                        st.metric("Valor Total", f"R$ {total_valor:,.2f}")
+                        total_valor = parse_number(df_filtered['Valor do Servico'], default=0.0).sum()
+                        st.metric("Valor Total", format_brl(total_valor))
                 with met_col3:
                     if 'Valor Liquido' in df_filtered.columns:
-                        total_liquido = df_filtered['Valor Liquido'].apply(convert_brazilian_number).sum()
-                        st.metric("Valor Líquido Total", f"R$ {total_liquido:,.2f}")
+                        total_liquido = parse_number(df_filtered['Valor Liquido'], default=0.0).sum()
+                        st.metric("Valor Líquido Total", format_brl(total_liquido))
             
             # Display filtered data
             st.markdown("### Dados Detalhados")
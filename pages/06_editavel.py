@@ -5,10 +5,12 @@ import urllib.parse
 import unicodedata
 import re
 import math
-import io
 from bson.objectid import ObjectId
 import streamlit.components.v1 as components
 
+from utils.br_format import format_number
+from utils.export import EXPORT_FORMATS, export_dataframe, export_file_name, export_mime
+
 def normalize_string_edit(texto):
     """
     Normaliza uma string removendo acentos e caracteres especiais
@@ -437,28 +439,13 @@ def processar_urls_edit(urls):
         return urls_validas[0] if urls_validas else None
     return None
 
-def formatar_valor_edit(valor):
+def formatar_colunas_edit(df, colunas):
     """
-    Formata valores para exibição nos cartões
+    Texto exibido nos cartões para cada coluna, formatado de uma vez
     """
-    if isinstance(valor, pd.Series):
-        valor = valor.iloc[0]
-    if pd.isna(valor):
-        return '-'
-    if isinstance(valor, (int, float)):
-        if float(valor).is_integer():
-            return f'{int(valor):,}'.replace(',', '.')
-        return f'{valor:.2f}'.replace('.', ',')
-    if isinstance(valor, str):
-        valor_limpo = valor.strip().replace(',', '.')
-        try:
-            valor_num = float(valor_limpo)
-            if float(valor_num).is_integer():
-                return f'{int(valor_num):,}'.replace(',', '.')
-            return f'{valor_num:.2f}'.replace('.', ',')
-        except ValueError:
-            return str(valor)[:35]
-    return str(valor)[:35]
+    df = df.loc[:, ~df.columns.duplicated()]
+    textos = {col: format_number(df[col], thousands='.', max_chars=35) for col in colunas if col in df.columns}
+    return pd.DataFrame(textos, index=df.index)
 
 def renderizar_cartoes_edit(df, colunas_edit_visiveis, nome_colecao_edit):
     """
@@ -467,12 +454,16 @@ def renderizar_cartoes_edit(df, colunas_edit_visiveis, nome_colecao_edit):
     gerenciador = GerenciadorCartoes(nome_colecao_edit)
     colunas_edit_imagem = [col for col in df.columns if 'url_imagens' in col.lower()]
     num_colunas_edit = 5
+    textos = formatar_colunas_edit(
+        df, [col for col in colunas_edit_visiveis if col not in colunas_edit_imagem and col != '_id']
+    )
     linhas = [df.iloc[i:i+num_colunas_edit] for i in range(0, len(df), num_colunas_edit)]
     
     for idx_linha, linha in enumerate(linhas):
         cols = st.columns(num_colunas_edit)
+        textos_linha = textos.iloc[idx_linha * num_colunas_edit:(idx_linha + 1) * num_colunas_edit]
         
-        for idx_col, (_, registro) in enumerate(linha.iterrows()):
+        for idx_col, ((_, registro), (_, texto)) in enumerate(zip(linha.iterrows(), textos_linha.iterrows())):
             with cols[idx_col]:
                 url_imagem = None
                 for col_img in colunas_edit_imagem:
@@ -484,7 +475,7 @@ def renderizar_cartoes_edit(df, colunas_edit_visiveis, nome_colecao_edit):
                 # Conteúdo do Cartão
                 detalhes_cartao = ''.join([
                     f'<div style="margin-bottom: 4px; font-size: 0.8rem;">'
-                    f'<strong>{col}:</strong> {formatar_valor_edit(registro.get(col, "-"))}</div>'
+                    f'<strong>{col}:</strong> {texto.get(col, "-")}</div>'
                     for col in colunas_edit_visiveis 
                     if col not in colunas_edit_imagem and col != '_id'
                 ])
@@ -627,6 +618,13 @@ def exibir_pagina_dados_edit(nome_colecao_edit):
     if not df.empty:
         renderizar_cartoes_edit(df, colunas_edit_visiveis, nome_colecao_edit)
         
+        formato_download = st.selectbox(
+            "Formato do download",
+            list(EXPORT_FORMATS),
+            format_func=lambda formato: EXPORT_FORMATS[formato][0],
+            key=f"formato_{nome_colecao_edit}"
+        )
+
         if st.button("📥 Baixar dados filtrados", key=f"download_{nome_colecao_edit}"):
             texto_progresso = "Preparando download..."
             barra_progresso = st.progress(0, text=texto_progresso)
@@ -646,15 +644,11 @@ def exibir_pagina_dados_edit(nome_colecao_edit):
             
             df_completo = pd.concat(todos_dados, ignore_index=True)
             
-            buffer = io.BytesIO()
-            with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                df_completo.to_excel(writer, index=False, sheet_name='Dados')
-            
             st.download_button(
-                label="💾 Clique para baixar Excel",
-                data=buffer.getvalue(),
-                file_name=f'{nome_colecao_edit}_dados.xlsx',
-                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                label="💾 Clique para baixar",
+                data=export_dataframe(df_completo, formato_download),
+                file_name=export_file_name(f'{nome_colecao_edit}_dados', formato_download),
+                mime=export_mime(formato_download)
             )
             
             barra_progresso.empty()
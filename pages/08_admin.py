@@ -3,7 +3,8 @@ import pandas as pd
 from pymongo import MongoClient, UpdateMany
 import urllib.parse
 from datetime import datetime
-from io import BytesIO
+
+from utils.export import export_dataframe, export_mime
 
 # Configuração da página Streamlit
 st.set_page_config(page_title="Processador de Dados", layout="wide")
@@ -122,11 +123,7 @@ def process_and_save_excel():
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             excel_filename = f"dados_unicos_{timestamp}.xlsx"
             
-            # Criar buffer em memória para o Excel
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df_tags.to_excel(writer, index=False)
-            excel_data = output.getvalue()
+            excel_data = export_dataframe(df_tags, 'xlsx', sheet_name='Sheet1')
        
         # Estatísticas
         st.success("Processamento concluído com sucesso!")
@@ -140,7 +137,7 @@ def process_and_save_excel():
             label="Download Excel com dados únicos",
             data=excel_data,
             file_name=excel_filename,
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            mime=export_mime('xlsx')
         )
        
         # Prévia dos dados
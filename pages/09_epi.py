@@ -3,11 +3,13 @@ import os
 import pandas as pd
 from pathlib import Path
 import tempfile
-import unicodedata
 import re
 from datetime import datetime
 import plotly.express as px
 
+from utils.export import write_xlsx
+from utils.text import slugify_series
+
 # Mantendo as funções auxiliares existentes
 def letter_to_number_str(text):
     def convert_char(c):
@@ -36,17 +38,6 @@ def get_portuguese_month(month_number):
     except (ValueError, TypeError):
         return ""
 
-def slugify(text):
-    if not isinstance(text, str):
-        text = str(text)
-    text = text.lower()
-    text = unicodedata.normalize('NFKD', text)
-    text = text.encode('ascii', 'ignore').decode('utf-8')
-    text = re.sub(r'[^a-z0-9]+', '-', text)
-    text = text.strip('-')
-    text = re.sub(r'-+', '-', text)
-    return text
-
 def get_downloads_folder():
     return str(Path.home() / "Downloads")
 
@@ -88,7 +79,7 @@ def process_files(uploaded_files):
                 df['Nome do Arquivo'].astype(str).str[:8] + '_' +
                 df['Solicitante'].astype(str)
             )
-            df['req_cod'] = df['req_cod'].apply(slugify)
+            df['req_cod'] = slugify_series(df['req_cod'])
             df['req_cod'] = df['req_cod'].str.replace('-', '').str.upper()
             df['req_cod'] = 'req'+df['req_cod'].apply(letter_to_number_str)
         
@@ -100,7 +91,7 @@ def process_files(uploaded_files):
                 df['Qtd. Solicitada'].astype(str) + '' +
                 df['req_cod'].astype(str)
             )
-            df['unique'] = df['unique'].apply(slugify).str.rstrip()
+            df['unique'] = slugify_series(df['unique']).str.rstrip()
         
         dfs.append(df)
         os.unlink(tmp_path)
@@ -232,7 +223,7 @@ def main():
     
                             randon = datetime.now().strftime("%d%m%Y%H%M%S") + str(datetime.now().microsecond)[:3]
                             output_path = os.path.join(get_downloads_folder(), f'REQS_EPI_{randon}.xlsx')
-                            df_principal.to_excel(output_path, index=False)
+                            write_xlsx(df_principal, output_path, sheet_name='Sheet1')
                             
                             st.session_state.processed_df = df_principal
                             st.success(f"✅ Arquivo salvo com sucesso em: {output_path}")
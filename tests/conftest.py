@@ -0,0 +1,71 @@
+import io
+import os
+import sys
+
+import pytest
+
+# Os testes importam os módulos de utils/ e benchmarks/ a partir da raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_upload(name, data):
+    """Arquivo enviado como o UploadedFile do Streamlit (bytes com `name`, `size` e getvalue())."""
+    upload = io.BytesIO(data)
+    upload.name = name
+    upload.size = len(data)
+    return upload
+
+@pytest.fixture
+def upload():
+    return make_upload
+
+class FakeBulkResult:
+    def __init__(self, upserted_count, modified_count, matched_count):
+        self.upserted_count = upserted_count
+        self.modified_count = modified_count
+        self.matched_count = matched_count
+
+class FakeCursor(list):
+    def batch_size(self, size):
+        return self
+
+class FakeCollection:
+    """Collection do MongoDB em memória, só com o que mongo_bulk e po_delta usam (UpdateOne com upsert)."""
+
+    def __init__(self, documents=()):
+        self.documents = [dict(document) for document in documents]
+        self.indexes = []
+
+    def create_index(self, keys):
+        self.indexes.append(keys)
+
+    def find(self, query=None, projection=None):
+        query = query or {}
+        found = FakeCursor()
+        for document in self.documents:
+            if all(document.get(field) == value for field, value in query.items()):
+                found.append({field: value for field, value in document.items()
+                              if not projection or projection.get(field)})
+        return found
+
+    def bulk_write(self, operations, ordered=True):
+        upserted = modified = matched = 0
+        for operation in operations:
+            query, update = operation._filter, operation._doc
+            document = next((document for document in self.documents
+                             if all(document.get(field) == value for field, value in query.items())), None)
+            if document is None:
+                document = dict(query, **update.get('$setOnInsert', {}))
+                document.update(update['$set'])
+                self.documents.append(document)
+                upserted += 1
+                continue
+            matched += 1
+            changed = {field: value for field, value in update['$set'].items() if document.get(field) != value}
+            if changed:
+                document.update(changed)
+                modified += 1
+        return FakeBulkResult(upserted, modified, matched)
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
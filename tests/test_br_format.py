@@ -0,0 +1,53 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from utils.br_format import format_brl, format_date, format_number, parse_date, parse_number
+
+def test_parse_number_formato_brasileiro():
+    values = pd.Series(['1.234,56', 'R$ 1.234,56', '-12,5', '1.234', '12.5', 7, 'abc', None, ''], dtype=object)
+    expected = [1234.56, 1234.56, -12.5, 1234.0, 12.5, 7.0, np.nan, np.nan, np.nan]
+    np.testing.assert_array_equal(parse_number(values).to_numpy(), expected)
+
+def test_parse_number_escalar_e_padrao():
+    assert parse_number('2.500,10') == 2500.1
+    assert parse_number('inválido', default=0) == 0
+    assert parse_number(3) == 3.0
+
+def test_format_brl():
+    values = pd.Series([1234.56, -1234.56, 0.999, 1e6, 0.125, 0.135, -0.001, np.nan, np.inf, '1.234,5'], dtype=object)
+    expected = ['R$ 1.234,56', 'R$ -1.234,56', 'R$ 1,00', 'R$ 1.000.000,00', 'R$ 0,12', 'R$ 0,14',
+                'R$ 0,00', 'R$ 0,00', 'R$ 0,00', 'R$ 1.234,50']
+    assert format_brl(values).tolist() == expected
+    assert format_brl(42) == 'R$ 42,00'
+
+def format_currency(value):
+    """format_currency original (pages/02_update_po.py), referência para valores positivos."""
+    value = float(value)
+    integer_part = int(value)
+    decimal_part = int(round((value - integer_part) * 100))
+    formatted_integer = '{:,}'.format(integer_part).replace(',', '.')
+    return f"R$ {formatted_integer},{decimal_part:02d}"
+
+def test_format_brl_igual_ao_format_currency_original():
+    values = np.round(np.random.default_rng(0).uniform(0, 1e7, 2000), 3)
+    original = [format_currency(value) for value in values]
+    # O original não carregava 100 centavos para a parte inteira ('R$ 1,100'); esses casos ficam de fora
+    kept = [index for index, text in enumerate(original) if not text.endswith(',100')]
+    assert format_brl(pd.Series(values)).iloc[kept].tolist() == [original[index] for index in kept]
+
+def test_format_number():
+    values = pd.Series([1234, 1234.5, -0.5, 'texto longo demais', None], dtype=object)
+    assert format_number(values, max_chars=5).tolist() == ['1234', '1234,50', '-0,50', 'texto', '-']
+    assert format_number(pd.Series([1234567]), thousands='.').tolist() == ['1.234.567']
+    assert format_number(pd.Series([1, None], dtype='Int64'), na=None).isna().tolist() == [False, True]
+
+def test_parse_e_format_date():
+    values = pd.Series(['31/12/2024', '2024-01-05', '05.02.2024', datetime.date(2024, 3, 1), 'x', None], dtype=object)
+    parsed = parse_date(values)
+    assert parsed.iloc[:4].tolist() == [pd.Timestamp(2024, 12, 31), pd.Timestamp(2024, 1, 5),
+                                        pd.Timestamp(2024, 2, 5), pd.Timestamp(2024, 3, 1)]
+    assert parsed.iloc[4:].isna().all()
+    assert format_date(values).iloc[:4].tolist() == ['31/12/2024', '05/01/2024', '05/02/2024', '01/03/2024']
+    assert format_date('2024-06-30') == '30/06/2024'
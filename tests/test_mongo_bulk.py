@@ -0,0 +1,51 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pymongo')
+
+from utils.mongo_bulk import bulk_upsert, to_mongo_records, upsert_operations
+
+def test_to_mongo_records():
+    df = pd.DataFrame({
+        'unique': ['a', 'b'],
+        'inteiro': pd.array([1, None], dtype='Int64'),
+        'valor': [1.5, np.nan],
+        'data': pd.to_datetime(['2024-05-01 10:20:30', None]),
+        'hora': [datetime.time(8, 30), None],
+        'texto': ['x', None],
+    })
+    records = to_mongo_records(df)
+    assert records == [
+        {'unique': 'a', 'inteiro': 1, 'valor': 1.5, 'data': '2024-05-01 10:20:30', 'hora': '08:30:00', 'texto': 'x'},
+        {'unique': 'b', 'inteiro': None, 'valor': None, 'data': None, 'hora': None, 'texto': None},
+    ]
+    assert type(records[0]['inteiro']) is int and type(records[0]['valor']) is float
+
+def test_upsert_operations_grava_creation_date_na_insercao():
+    record = {'unique': 'a', 'valor': 1, '_id': 'x', 'creation_date': 'antiga', 'observation': 'editada'}
+    operation, = upsert_operations([record], 'unique')
+    assert operation._filter == {'unique': 'a'}
+    assert operation._doc['$set'] == {'unique': 'a', 'valor': 1}
+    # creation_date no mesmo texto UTC gravado pela página de upload (clean_dataframe)
+    creation_date = operation._doc['$setOnInsert']['creation_date']
+    assert datetime.datetime.strptime(creation_date, '%Y-%m-%d %H:%M:%S')
+    assert operation._doc['$setOnInsert']['observation'] == ""
+
+def test_bulk_upsert(collection):
+    df = pd.DataFrame({'unique': ['a', 'b', 'b', None], 'valor': [1.0, 2.0, 3.0, 4.0]})
+    calls = []
+    summary = bulk_upsert(collection, df, batch_size=1, workers=2, progress=lambda done, total: calls.append(total))
+    assert summary == {'inseridos': 2, 'atualizados': 0, 'inalterados': 0, 'ignorados': 2}
+    assert calls == [2, 2]
+    assert collection.indexes == [[('unique', 1)]]
+
+    df = pd.DataFrame({'unique': ['a', 'b', 'c'], 'valor': [1.0, 20.0, 5.0]})
+    summary = bulk_upsert(collection, df)
+    assert summary == {'inseridos': 1, 'atualizados': 1, 'inalterados': 1, 'ignorados': 0}
+    stored = {document['unique']: document for document in collection.documents}
+    assert stored['b']['valor'] == 20.0
+    # creation_date e observation vêm só da inserção
+    assert set(stored['c']) == {'unique', 'valor', 'creation_date', 'observation'}
@@ -0,0 +1,90 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+
+from benchmarks.nfe_synthetic import ANDRITZ_CNPJ, SyntheticCatalog, synthetic_batch, synthetic_nfe
+from utils.nfe_xml import NFE_COLUMNS, PARALLEL_MIN_FILES, AccessKeySet, NFeFilter, ReadXML, read_access_key
+
+@pytest.fixture(scope='module')
+def batch():
+    return synthetic_batch(PARALLEL_MIN_FILES + 5, items=(1, 6), seed=7)
+
+def read(files, **options):
+    reader = ReadXML(files, **options)
+    return reader.process_xml_files().to_pandas(), reader
+
+def uploads(batch, upload):
+    return [upload(name, data) for name, data in batch]
+
+def test_uma_linha_por_item(batch, upload):
+    df, reader = read(uploads(batch, upload), backend='stdlib')
+    assert list(df.columns) == NFE_COLUMNS
+    assert reader.errors == []
+    expected = sum(data.count(b'<det nItem=') for _, data in batch)
+    assert len(df) == expected
+    # Cada nota mantém a numeração dos seus itens e a chave do atributo Id de <infNFe>
+    for chave, items in df.groupby('chaveNfe', sort=False)['Item Nota']:
+        assert chave.startswith('NFe') and len(chave) == 47
+        assert items.tolist() == list(range(1, len(items) + 1))
+    assert pd.api.types.is_float_dtype(df['vlTotProd'])
+
+def test_campos_da_nota():
+    catalog = SyntheticCatalog(seed=1)
+    data = synthetic_nfe(0, catalog, items=2, seed=1)
+    df, _ = read([io.BytesIO(data)], backend='stdlib')
+    assert df['chaveNfe'].iloc[0] == 'NFe' + read_access_key(data)
+    assert df['NFe'].tolist() == ['1', '1']
+    assert (df['vlTotProd'] > 0).all()
+    assert df['CNPJ Destinatário'].iloc[0] in {ANDRITZ_CNPJ} | {cnpj for cnpj, _, _ in catalog.suppliers}
+
+def test_lxml_igual_a_stdlib(batch, upload):
+    pytest.importorskip('lxml', minversion='5')
+    stdlib, _ = read(uploads(batch, upload), backend='stdlib')
+    lxml, _ = read(uploads(batch, upload), backend='lxml')
+    pd.testing.assert_frame_equal(stdlib, lxml)
+
+def test_paralelo_igual_ao_sequencial(batch, upload):
+    sequencial, _ = read(uploads(batch, upload), workers=1)
+    paralelo, _ = read(uploads(batch, upload), workers=2)
+    pd.testing.assert_frame_equal(sequencial, paralelo)
+
+def test_zip_igual_aos_arquivos(batch, upload):
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, 'w') as archive:
+        for name, data in batch:
+            archive.writestr(f'notas/{name}', data)
+    arquivos, _ = read(uploads(batch, upload))
+    compactados, reader = read([upload('notas.zip', content.getvalue())])
+    pd.testing.assert_frame_equal(arquivos, compactados)
+    assert reader.count_sources() == len(batch)
+
+def test_arquivo_invalido_vira_erro(batch, upload):
+    files = uploads(batch[:3], upload) + [upload('quebrado.xml', b'<nfeProc><NFe>')]
+    df, reader = read(files)
+    assert [name for name, _ in reader.errors] == ['quebrado.xml']
+    assert df['chaveNfe'].nunique() == 3
+
+def test_filtros(batch, upload):
+    chaves = [read_access_key(data) for _, data in batch]
+    filters = NFeFilter(dest_cnpjs=[ANDRITZ_CNPJ], known_keys=chaves[:4])
+    df, reader = read(uploads(batch, upload), filters=filters)
+    assert reader.skipped['chave já conhecida'] == 4
+    assert (df['CNPJ Destinatário'] == ANDRITZ_CNPJ).all()
+    assert not set(df['chaveNfe'].str[3:]) & set(chaves[:4])
+
+    sem_filtro, _ = read(uploads(batch, upload))
+    somente_5102 = sem_filtro[sem_filtro['cfop'] == '5102']
+    df, _ = read(uploads(batch, upload), filters=NFeFilter(cfop_include=['5102']))
+    assert df['cfop'].eq('5102').all()
+    # Os itens aceitos mantêm a posição original na nota
+    assert df[['chaveNfe', 'Item Nota']].values.tolist() == somente_5102[['chaveNfe', 'Item Nota']].values.tolist()
+
+def test_access_key_set():
+    chaves = [f'{n:044d}' for n in (5, 1, 3)]
+    keys = AccessKeySet(chaves)
+    keys.update(['NFe' + f'{7:044d}', 'curta'])
+    assert len(keys) == 4
+    assert chaves[0] in keys and 'NFe' + chaves[1] in keys and f'{7:044d}' in keys
+    assert f'{2:044d}' not in keys and 'curta' not in keys
@@ -0,0 +1,56 @@
+import pytest
+
+from benchmarks.nfse_synthetic import synthetic_nfse, synthetic_nfse_fields
+from utils.nfse_pdf import (
+    NFSE_FIELDS, PARALLEL_MIN_FILES, REQUIRED_FIELDS, extract_nfse, read_nfse_pdfs, resolve_backend,
+)
+
+BACKENDS = ['pdfplumber', pytest.param('pdfium', marks=pytest.mark.skipif(
+    resolve_backend('pdfium') != 'pdfium', reason='pypdfium2 não instalado'))]
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('index, annex_pages', [(0, 0), (1, 1), (2, 3)])
+def test_extrai_os_campos(backend, index, annex_pages):
+    record, error = extract_nfse(synthetic_nfse(index, annex_pages), f'nfse_{index}.pdf', backend=backend)
+    assert error is None
+    assert record['Nome do Arquivo'] == f'nfse_{index}.pdf'
+    for column, value in synthetic_nfse_fields(index).items():
+        assert record[column] == value, column
+
+def test_leitores_iguais():
+    """O pypdfium2 só pode ser usado no lugar do pdfplumber se a extração for a mesma em todos os campos."""
+    if resolve_backend('pdfium') != 'pdfium':
+        pytest.skip('pypdfium2 não instalado')
+    for index in range(12):
+        data = synthetic_nfse(index, annex_pages=index % 3)
+        plumber, _ = extract_nfse(data, 'nota.pdf', backend='pdfplumber', required=None)
+        pdfium, _ = extract_nfse(data, 'nota.pdf', backend='pdfium', required=None)
+        assert pdfium == plumber
+
+def test_para_de_ler_quando_acha_os_campos():
+    data = synthetic_nfse(5, annex_pages=4)
+    completo, _ = extract_nfse(data, 'nota.pdf', required=None)
+    parcial, _ = extract_nfse(data, 'nota.pdf')
+    # Os campos obrigatórios são os mesmos; os demais só são procurados nas páginas lidas
+    required = [column for column, field in NFSE_FIELDS.items() if field in REQUIRED_FIELDS]
+    assert {column: parcial[column] for column in required} == {column: completo[column] for column in required}
+    assert 'Anexo' not in parcial['Avisos']
+
+def test_pdf_invalido_vira_erro(upload):
+    files = [upload('a.pdf', synthetic_nfse(0)), upload('quebrado.pdf', b'%PDF-1.4 quebrado'), upload('b.pdf', synthetic_nfse(1))]
+    calls = []
+    records, errors = read_nfse_pdfs(files, progress=lambda done, total, name: calls.append((done, total, name)))
+    assert [record['Nome do Arquivo'] for record in records] == ['a.pdf', 'quebrado.pdf', 'b.pdf']
+    assert [name for name, _ in errors] == ['quebrado.pdf']
+    assert all(records[1][column] is None for column in NFSE_FIELDS)
+    assert records[2]['Numero NFS-e'] == synthetic_nfse_fields(1)['Numero NFS-e']
+    assert calls == [(1, 3, 'a.pdf'), (2, 3, 'quebrado.pdf'), (3, 3, 'b.pdf')]
+
+def test_paralelo_igual_ao_sequencial(upload):
+    files = [upload(f'nfse_{index}.pdf', synthetic_nfse(index, annex_pages=index % 2))
+             for index in range(PARALLEL_MIN_FILES + 2)]
+    assert read_nfse_pdfs(files, workers=2) == read_nfse_pdfs(files, workers=1)
+
+def test_leitor_invalido():
+    with pytest.raises(ValueError):
+        resolve_backend('pypdf')
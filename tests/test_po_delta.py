@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pymongo')
+
+from utils.po_delta import HASH_FIELD, compute_delta, load_stored_hashes, row_hashes, upsert_delta
+
+def exportacao():
+    return pd.DataFrame({
+        'unique': ['10', '11', '20', '21', None],
+        'Purchasing Document': pd.array([1, 1, 2, 2, 3], dtype='Int64'),
+        'Order Quantity': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'Document Date': pd.to_datetime(['2024-01-01'] * 5),
+    })
+
+def test_row_hashes():
+    df = exportacao()
+    hashes = row_hashes(df)
+    assert hashes.is_unique
+    # A ordem das colunas e a chave não mudam o hash; o tipo do valor muda
+    pd.testing.assert_series_equal(row_hashes(df[df.columns[::-1]]), hashes)
+    pd.testing.assert_series_equal(row_hashes(df.assign(unique=list('abcde'))), hashes)
+    assert row_hashes(df.assign(**{'Order Quantity': ['1.0', '2.0', '3.0', '4.0', '5.0']})).ne(hashes).all()
+
+def test_compute_delta_e_upsert(collection):
+    df = exportacao()
+    delta = compute_delta(df, load_stored_hashes(collection))
+    assert len(delta['novos']) == 4 and delta['alterados'].empty
+    assert delta['ignorados'] == 1 and delta['removidos'] == []
+    upsert_delta(collection, delta)
+    assert {document['unique']: document[HASH_FIELD] for document in collection.documents} == \
+        dict(zip(delta['novos']['unique'], delta['novos'][HASH_FIELD]))
+
+    # Item 11 alterado e item 21 fora da nova exportação (a PO 2 veio nela, então ele conta como removido)
+    changed = df.iloc[[0, 1, 2]].assign(**{'Order Quantity': [1.0, 9.0, 3.0]})
+    delta = compute_delta(changed, load_stored_hashes(collection))
+    assert delta['novos'].empty
+    assert delta['alterados']['unique'].tolist() == ['11']
+    assert delta['inalterados'] == 2
+    assert delta['removidos'] == ['21']
+    summary = upsert_delta(collection, delta)
+    assert summary['atualizados'] == 1 and summary['inseridos'] == 0
+
+def test_po_ausente_nao_indica_remocao():
+    stored = {'99': ('hash', 9)}
+    assert compute_delta(exportacao(), stored)['removidos'] == []
+
+def test_documentos_sem_hash_sao_alterados(collection):
+    df = exportacao()
+    collection.documents.append({'unique': '10', 'Purchasing Document': 1})
+    delta = compute_delta(df, load_stored_hashes(collection))
+    assert delta['alterados']['unique'].tolist() == ['10']
+    assert len(delta['novos']) == 3
@@ -0,0 +1,43 @@
+import pandas as pd
+import polars as pl
+
+from benchmarks.nfe_synthetic import synthetic_batch
+from utils.result_cache import ResultCache, content_key, estimate_size, frame_fingerprint
+
+def test_content_key(upload):
+    batch = synthetic_batch(3, items=2, seed=1)
+    files = [upload(name, data) for name, data in batch]
+    key = content_key(files, 'v1')
+    assert key == content_key([upload(name, data) for name, data in batch], 'v1')
+    # Ordem do upload, conteúdo, nome e extras mudam a chave
+    assert key != content_key(files[::-1], 'v1')
+    assert key != content_key(files, 'v2')
+    assert key != content_key(files[:2] + [upload(batch[2][0], batch[2][1] + b' ')], 'v1')
+    assert key != content_key(files[:2] + [upload('outro.xml', batch[2][1])], 'v1')
+
+def test_frame_fingerprint():
+    frame = pl.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    assert frame_fingerprint(frame) == frame_fingerprint(frame.clone())
+    assert frame_fingerprint(frame) != frame_fingerprint(frame.with_columns(pl.lit('z').alias('b')))
+    assert frame_fingerprint(pl.DataFrame()) == (0, ())
+
+def test_estimate_size():
+    df = pd.DataFrame({'a': range(100)})
+    assert estimate_size({'df': df, 'bytes': b'12345', 'list': [b'12']}) == \
+        df.memory_usage(index=True, deep=True).sum() + 7
+
+def test_lru_por_tamanho():
+    cache = ResultCache(max_bytes=10)
+    assert cache.put('a', 'A', size=4) and cache.put('b', 'B', size=4)
+    assert cache.get('a') == 'A'
+    # 'b' é o menos usado e sai para caber 'c'
+    cache.put('c', 'C', size=4)
+    assert 'b' not in cache and cache.get('a') == 'A' and cache.get('c') == 'C'
+    assert cache.total_bytes == 8
+    # Maior que o limite inteiro: não é guardado
+    assert not cache.put('d', 'D', size=11)
+    assert len(cache) == 2 and cache.get('d') is None
+    cache.put('a', 'A2', size=2)
+    assert cache.get('a') == 'A2' and cache.total_bytes == 6
+    cache.clear()
+    assert len(cache) == 0 and cache.total_bytes == 0
@@ -0,0 +1,45 @@
+import io
+
+import numpy as np
+import pytest
+
+from benchmarks.nfe_synthetic import synthetic_batch
+from utils import search
+from utils.nfe_xml import ReadXML
+from utils.search import SearchIndex, tokenize
+from utils.text import ascii_lower
+
+@pytest.fixture(scope='module')
+def notas():
+    files = []
+    for name, data in synthetic_batch(40, items=(1, 8), seed=3):
+        file = io.BytesIO(data)
+        file.name = name
+        files.append(file)
+    return ReadXML(files).process_xml_files().to_pandas()
+
+def substring_filter(df, query):
+    """Filtro original da página: todos os termos contidos (sem acento, minúsculas) em alguma coluna da linha."""
+    text = df.astype(str).map(ascii_lower)
+    mask = np.ones(len(df), dtype=bool)
+    for term in tokenize(query):
+        mask &= text.apply(lambda column: column.str.contains(term, regex=False)).any(axis=1).to_numpy()
+    return np.flatnonzero(mask)
+
+def test_tokenize():
+    assert tokenize('Válvula  AÇO-inox 3/4"') == ['valvula', 'aco', 'inox', '3', '4']
+
+@pytest.mark.parametrize('query', ['valvula', 'VÁLVULA', 'aco inox', 'fornecedor 2', 'mat001', 'curitiba', 'xyz'])
+def test_busca_igual_ao_filtro_por_substring(notas, query):
+    index = SearchIndex(notas)
+    np.testing.assert_array_equal(index.search(query), substring_filter(notas, query))
+
+def test_busca_vazia_devolve_todas(notas):
+    np.testing.assert_array_equal(SearchIndex(notas).search('  '), np.arange(len(notas)))
+
+def test_cache_de_termos_limitado(notas, monkeypatch):
+    monkeypatch.setattr(search, 'TERM_CACHE_SIZE', 3)
+    index = SearchIndex(notas)
+    for term in ['aco', 'inox', 'tubo', 'motor', 'aco']:
+        index.search(term)
+    assert list(index._term_cache) == ['tubo', 'motor', 'aco']
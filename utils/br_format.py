@@ -0,0 +1,181 @@
+import datetime
+import numbers
+
+import numpy as np
+import pandas as pd
+
+# Formatos aceitos na leitura de datas em texto, tentados na ordem
+DATE_FORMATS = ('%d/%m/%Y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d.%m.%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S')
+
+# Texto só com separador de milhar ('1.234', '12.345.678'): o ponto não é decimal
+_THOUSANDS_ONLY = r'-?\d{1,3}(?:\.\d{3})+'
+
+# Limites de 2 a 19 dígitos, para contar os dígitos de inteiros sem log10
+_POWERS_OF_TEN = 10 ** np.arange(1, 19, dtype=np.int64)
+
+# Classes dos valores de uma coluna object
+_OTHER, _TEXT, _NUMBER = range(3)
+
+def parse_number(values, default=np.nan):
+    """Números em formato brasileiro ('1.234,56', 'R$ 1.234,56', '-12,5', '1.234') para float, de uma vez.
+
+    Aceita Series, arrays, listas ou um valor só (devolve o mesmo formato: Series ou escalar). Números
+    passam direto; textos inválidos, vazios e outros objetos viram `default`.
+    """
+    series, scalar = _as_series(values)
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        kinds = _kinds(series)
+        result = pd.Series(np.nan, index=series.index)
+        is_number = kinds == _NUMBER
+        if is_number.any():
+            result[is_number] = series[is_number].astype(np.float64)
+        is_text = kinds == _TEXT
+        if is_text.any():
+            text = series[is_text].astype(str).str.replace(r'R\$|\s', '', regex=True)
+            brazilian = text.str.contains(',', regex=False) | text.str.fullmatch(_THOUSANDS_ONLY)
+            text = text.where(~brazilian, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+            result[is_text] = pd.to_numeric(text, errors='coerce')
+    else:
+        result = series.astype(np.float64)
+    if not pd.isna(default):
+        result = result.fillna(default)
+    return result.iloc[0] if scalar else result
+
+def format_brl(values):
+    """'R$ 1.234,56' para cada valor (números ou textos em formato brasileiro); vazios e inválidos viram 'R$ 0,00'.
+
+    A parte inteira é truncada e os centavos arredondados metade para o par, como o format_currency
+    original; negativos levam o sinal na frente ('R$ -1.234,56').
+    """
+    parsed = parse_number(values)
+    series = parsed if isinstance(parsed, pd.Series) else pd.Series([parsed])
+    text = pd.Series('R$ 0,00', index=series.index, dtype=object)
+    amounts = series.to_numpy(dtype=np.float64)
+    valid = np.isfinite(amounts) & (np.abs(amounts) < 2 ** 63)
+    if valid.any():
+        negative, integer, cents = _split_cents(amounts[valid])
+        text[valid] = _compose(negative, integer, cents, prefix='R$ ', thousands='.')
+    huge = np.isfinite(amounts) & ~valid
+    if huge.any():
+        # Fora do int64: formatados um a um com o int do Python
+        text[huge] = [f"R$ {'-' if amount < 0 else ''}{int(abs(amount)):,}".replace(',', '.') + ',00'
+                      for amount in amounts[huge]]
+    return text if isinstance(parsed, pd.Series) else text.iloc[0]
+
+def format_number(values, thousands='', na='-', max_chars=None):
+    """Texto de exibição: inteiros sem casas ('1234', ou '1.234' com `thousands='.'`), demais com duas casas e
+    vírgula ('1234,56'). Textos numéricos são lidos em formato brasileiro; outros textos e objetos são
+    exibidos como estão, cortados em `max_chars`. Vazios viram `na` (None mantém o valor original).
+    """
+    series, scalar = _as_series(values)
+    result = pd.Series(index=series.index, dtype=object)
+    if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        present = series.notna().to_numpy()
+        integers = series[present].to_numpy(dtype=np.int64)
+        result[present] = _compose(integers < 0, np.abs(integers), thousands=thousands)
+    else:
+        kinds = np.full(len(series), _NUMBER) if pd.api.types.is_float_dtype(series) else _kinds(series)
+        amounts = parse_number(series).to_numpy(dtype=np.float64)
+        finite = np.isfinite(amounts) & (np.abs(amounts) < 2 ** 63) & (kinds != _OTHER)
+        integral = finite & (amounts == np.floor(amounts))
+        integers = amounts[integral].astype(np.int64)
+        result[integral] = _compose(integers < 0, np.abs(integers), thousands=thousands)
+        decimal = finite & ~integral
+        if decimal.any():
+            negative, integer, cents = _split_cents(amounts[decimal])
+            result[decimal] = _compose(negative, integer, cents, thousands=thousands)
+        # Textos não numéricos, infinitos e outros objetos como texto
+        rest = ~finite & series.notna().to_numpy()
+        if rest.any():
+            result[rest] = series[rest].map(lambda value: str(value)[:max_chars])
+    missing = series.isna().to_numpy()
+    result[missing] = series[missing] if na is None else na
+    return result.iloc[0] if scalar else result
+
+def parse_date(values, formats=DATE_FORMATS):
+    """datetime64 a partir de datas do Excel/Python ou textos nos `formats` (tentados na ordem); o resto vira NaT."""
+    series, scalar = _as_series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.iloc[0] if scalar else series
+    dates = series.map(lambda value: isinstance(value, (datetime.date, np.datetime64)))
+    result = pd.to_datetime(series.where(dates), errors='coerce')
+    text = pd.Series(_kinds(series) == _TEXT, index=series.index)
+    for fmt in formats:
+        pending = text & result.isna()
+        if not pending.any():
+            break
+        result[pending] = pd.to_datetime(series[pending], format=fmt, errors='coerce')
+    return result.iloc[0] if scalar else result
+
+def format_date(values, fmt='%d/%m/%Y', formats=DATE_FORMATS):
+    """Datas como texto (padrão dd/mm/aaaa); valores que não são datas viram NaN."""
+    dates = parse_date(values, formats)
+    if not isinstance(dates, pd.Series):
+        return np.nan if pd.isna(dates) else dates.strftime(fmt)
+    return dates.dt.strftime(fmt)
+
+def _as_series(values):
+    if isinstance(values, pd.Series):
+        return values, False
+    if isinstance(values, (np.ndarray, pd.Index, list, tuple)):
+        return pd.Series(values), False
+    return pd.Series([values], dtype=object), True
+
+def _kinds(series):
+    """Classe de cada valor (texto, número ou outro), sem converter a coluna."""
+    return np.fromiter((_kind(value) for value in series), dtype=np.int8, count=len(series))
+
+def _kind(value):
+    if isinstance(value, str):
+        return _TEXT
+    if isinstance(value, numbers.Real) and not isinstance(value, (bool, np.bool_)):
+        return _NUMBER
+    return _OTHER
+
+def _split_cents(amounts):
+    """Sinal, parte inteira truncada e centavos (metade para o par) de valores finitos; 100 centavos sobem."""
+    absolute = np.abs(amounts)
+    integer = np.trunc(absolute)
+    cents = np.round((absolute - integer) * 100).astype(np.int64)
+    carry = cents == 100
+    integer = integer.astype(np.int64) + carry
+    cents[carry] = 0
+    negative = (amounts < 0) & ((integer > 0) | (cents > 0))
+    return negative, integer, cents
+
+def _compose(negative, integer, cents=None, prefix='', thousands='', decimal=','):
+    """'<prefixo><sinal><inteiro com milhar>[<decimal><centavos>]' para cada linha, sem laço por valor.
+
+    Os textos são montados alinhados à direita numa matriz de bytes: a coluna k (da direita) de todas as
+    linhas recebe o mesmo tipo de caractere, então o laço é só sobre a largura do maior número.
+    `integer` são inteiros não negativos (int64) e `thousands` um caractere ou ''.
+    """
+    count = len(integer)
+    if count == 0:
+        return np.empty(0, dtype=object)
+    digits = 1 + (integer[:, None] >= _POWERS_OF_TEN).sum(axis=1)
+    body = digits + ((digits - 1) // 3 if thousands else 0)
+    tail = 0 if cents is None else 3
+    prefix = prefix.encode('ascii')
+    widest = int(body.max())
+    width = len(prefix) + 1 + widest + tail
+    chars = np.full((count, width), ord(' '), dtype=np.uint8)
+    if cents is not None:
+        chars[:, -3] = ord(decimal)
+        chars[:, -2] = ord('0') + cents // 10
+        chars[:, -1] = ord('0') + cents % 10
+    remaining = integer.copy()
+    for position in range(widest):
+        column = width - tail - 1 - position
+        active = position < body
+        if thousands and position % 4 == 3:
+            chars[active, column] = ord(thousands)
+        else:
+            chars[active, column] = ord('0') + remaining[active] % 10
+            remaining //= 10
+    rows = np.arange(count)
+    start = width - tail - body - negative
+    chars[rows[negative], start[negative]] = ord('-')
+    for offset, char in enumerate(prefix):
+        chars[rows, start - len(prefix) + offset] = char
+    return np.char.lstrip(chars.view(f'S{width}').ravel()).astype(str).astype(object)
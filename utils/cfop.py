@@ -0,0 +1,54 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Tabela de regras CFOP -> categoria, editável sem alterar o código.
+# cfop com 4 dígitos é um código exato, com 1 dígito vale para todos os CFOPs iniciados por ele
+# e '*' é a categoria padrão. Códigos exatos têm prioridade sobre o prefixo.
+# Quando 'andritz' é 'emitente' ou 'destinatario' e a Andritz ocupa esse papel na nota,
+# usa-se 'categoria_andritz' no lugar de 'categoria'.
+CFOP_RULES_PATH = os.path.join(os.path.dirname(__file__), 'cfop_categorias.csv')
+
+@lru_cache(maxsize=4)
+def load_cfop_rules(path=CFOP_RULES_PATH):
+    """Carrega a tabela de regras uma única vez por processo."""
+    rules = pd.read_csv(path, dtype=str, keep_default_na=False)
+    rules['cfop'] = rules['cfop'].str.strip()
+    return rules
+
+def normalize_cfop(cfop):
+    """Converte a coluna de CFOP (texto, inteiro ou float) para texto com 4 dígitos, sem '.0'."""
+    numeric = pd.to_numeric(cfop, errors='coerce')
+    return numeric.astype('Int64').astype(str).where(numeric.notna(), cfop.astype(str).str.strip())
+
+def is_andritz(nomes):
+    """Máscara booleana das linhas cujo nome contém 'ANDRITZ' (avaliada uma vez por nome distinto)."""
+    codes, uniques = pd.factorize(nomes.astype(str))
+    found = pd.Series(uniques).str.upper().str.contains('ANDRITZ', regex=False).to_numpy()
+    return pd.Series(found[codes], index=nomes.index)
+
+def categorize_cfop(df, coluna, cfop_col='cfop', emit_col='emitNome', dest_col='destNome', rules=None):
+    """Categoriza todas as linhas de uma vez aplicando as regras de `coluna` da tabela de CFOP."""
+    if rules is None:
+        rules = load_cfop_rules()
+    rules = rules[rules['coluna'] == coluna]
+    exact = rules[rules['cfop'].str.len() > 1].set_index('cfop')
+    prefix = rules[rules['cfop'].str.len() == 1].set_index('cfop')
+    default = rules.loc[rules['cfop'] == '*', 'categoria']
+    default = default.iloc[0] if len(default) else None
+
+    codes = normalize_cfop(df[cfop_col])
+    first_digit = codes.str[:1]
+
+    categoria = codes.map(exact['categoria']).fillna(first_digit.map(prefix['categoria']))
+    categoria_andritz = codes.map(exact['categoria_andritz']).fillna(first_digit.map(prefix['categoria_andritz']))
+    papel = codes.map(exact['andritz']).fillna(first_digit.map(prefix['andritz']))
+
+    use_andritz = (categoria_andritz.fillna('') != '') & (
+        ((papel == 'emitente') & is_andritz(df[emit_col]))
+        | ((papel == 'destinatario') & is_andritz(df[dest_col]))
+    )
+    result = np.where(use_andritz, categoria_andritz, categoria)
+    return pd.Series(result, index=df.index).fillna(default)
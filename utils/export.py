@@ -0,0 +1,84 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import xlsxwriter
+
+# Formatos de exportação: rótulo exibido, extensão e MIME (para st.download_button)
+EXPORT_FORMATS = {
+    'xlsx': ('Excel (.xlsx)', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('CSV (.csv)', 'csv', 'text/csv'),
+    'parquet': ('Parquet (.parquet)', 'parquet', 'application/vnd.apache.parquet'),
+}
+
+# Limite de linhas de uma planilha do Excel (incluindo o cabeçalho)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Linhas convertidas para valores Python de cada vez na gravação do xlsx
+XLSX_CHUNK_ROWS = 10_000
+
+def write_xlsx(df, target, sheet_name='Dados', chunk_rows=XLSX_CHUNK_ROWS, progress=None):
+    """Grava o DataFrame em xlsx no modo constant_memory do xlsxwriter.
+
+    As linhas são convertidas em blocos de `chunk_rows` e gravadas em ordem, descarregadas em disco uma a
+    uma, então a memória extra depende do tamanho do bloco e não do tamanho da planilha. O resultado é o mesmo do df.to_excel(index=False) com xlsxwriter: cabeçalho em
+    negrito com borda, vazios como células em branco e datas no formato 'yyyy-mm-dd hh:mm:ss'.
+    `target` é um caminho ou um arquivo binário (ex.: BytesIO).
+    `progress(linhas_gravadas, total)` é chamado a cada bloco gravado.
+    """
+    if len(df) + 1 > EXCEL_MAX_ROWS:
+        raise ValueError(f"O Excel aceita no máximo {EXCEL_MAX_ROWS - 1} linhas; use CSV ou Parquet ({len(df)} linhas)")
+    workbook = xlsxwriter.Workbook(target, {
+        'constant_memory': True,
+        'nan_inf_to_errors': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    worksheet = workbook.add_worksheet(sheet_name)
+    header = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    worksheet.write_row(0, 0, [str(column) for column in df.columns], header)
+
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        columns = [_excel_values(chunk.iloc[:, position]) for position in range(chunk.shape[1])]
+        for row, values in enumerate(zip(*columns), start=start + 1):
+            worksheet.write_row(row, 0, values)
+        if progress is not None:
+            progress(start + len(chunk), len(df))
+    workbook.close()
+
+def _excel_values(series):
+    """Valores Python de uma coluna (None para vazios; datas sem fuso, que o Excel não suporta)."""
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_localize(None)
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def write_csv(df, target, sep=';', decimal=','):
+    """CSV no padrão do Excel em português (';' e vírgula decimal), UTF-8 com BOM."""
+    df.to_csv(target, index=False, sep=sep, decimal=decimal, encoding='utf-8-sig')
+
+def write_parquet(df, target):
+    """Parquet (zstd); colunas de texto com tipos misturados são gravadas como texto."""
+    arrays = []
+    for column in df.columns:
+        series = df[column]
+        try:
+            arrays.append(pa.Array.from_pandas(series))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array(series.map(str, na_action='ignore').where(series.notna(), None), type=pa.string()))
+    table = pa.Table.from_arrays(arrays, names=[str(column) for column in df.columns])
+    pq.write_table(table, target, compression='zstd')
+
+WRITERS = {'xlsx': write_xlsx, 'csv': write_csv, 'parquet': write_parquet}
+
+def export_dataframe(df, fmt='xlsx', **options):
+    """Conteúdo do arquivo exportado (bytes), pronto para o `data` do st.download_button (sem base64)."""
+    output = io.BytesIO()
+    WRITERS[fmt](df, output, **options)
+    return output.getvalue()
+
+def export_mime(fmt):
+    return EXPORT_FORMATS[fmt][2]
+
+def export_file_name(stem, fmt):
+    return f"{stem}.{EXPORT_FORMATS[fmt][1]}"
@@ -0,0 +1,103 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, time as dt_time, timezone
+
+import numpy as np
+import pandas as pd
+from pymongo import UpdateOne, errors
+
+BATCH_SIZE = 500
+MAX_RETRIES = 5
+RETRY_DELAY = 3
+
+def to_mongo_records(df):
+    """Converte o DataFrame em documentos para o MongoDB (equivalente ao clean_dataframe, porém por coluna).
+
+    NaN/NaT viram None, escalares numpy viram tipos Python e datas viram texto 'AAAA-MM-DD HH:MM:SS'.
+    """
+    return pd.DataFrame(to_mongo_columns(df), index=df.index).to_dict('records')
+
+def to_mongo_columns(df):
+    """Valores de cada coluna como são gravados por to_mongo_records ({coluna: Series object})."""
+    converted = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.dt.strftime('%Y-%m-%d %H:%M:%S').astype(object)
+        elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            values = series.astype(object)
+        else:
+            values = series.map(_clean_value, na_action='ignore').astype(object)
+        converted[column] = values.where(series.notna(), None)
+    return converted
+
+def _clean_value(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dt_time):
+        return value.strftime('%H:%M:%S')
+    if isinstance(value, (np.datetime64, datetime)):
+        return str(value)
+    return value
+
+def upsert_operations(records, key):
+    """Um UpdateOne com upsert por documento: os campos são atualizados e creation_date/observation
+    só são gravados na inserção (mantém a data original e observações editadas).
+
+    A creation_date é o horário UTC em texto 'AAAA-MM-DD HH:MM:SS', como o clean_dataframe do upload grava.
+    """
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    operations = []
+    for record in records:
+        record.pop('_id', None)
+        record.pop('creation_date', None)
+        record.pop('observation', None)
+        operations.append(UpdateOne(
+            {key: record[key]},
+            {'$set': record, '$setOnInsert': {'creation_date': now, 'observation': ""}},
+            upsert=True,
+        ))
+    return operations
+
+def _write_batch(collection, operations):
+    """bulk_write não ordenado de um lote, repetindo em falhas transitórias de rede."""
+    for attempt in range(MAX_RETRIES):
+        try:
+            result = collection.bulk_write(operations, ordered=False)
+            return result.upserted_count, result.modified_count, result.matched_count
+        except (errors.AutoReconnect, errors.NetworkTimeout):
+            if attempt == MAX_RETRIES - 1:
+                raise
+            time.sleep(RETRY_DELAY)
+
+def bulk_upsert(collection, df, key='unique', batch_size=BATCH_SIZE, workers=4, progress=None):
+    """Grava o DataFrame na collection com upserts pela chave `key`, em lotes enviados em paralelo.
+
+    Linhas sem chave são ignoradas e linhas repetidas no DataFrame são gravadas uma vez.
+    `progress(documentos_gravados, total)` é chamado ao fim de cada lote.
+    Retorna um dict com inseridos, atualizados, inalterados e ignorados.
+    """
+    valid = df[df[key].notna()].drop_duplicates(subset=key, keep='first')
+    skipped = len(df) - len(valid)
+    # Sem índice na chave cada upsert percorre a collection inteira
+    collection.create_index([(key, 1)])
+
+    records = to_mongo_records(valid)
+    batches = [upsert_operations(records[i:i + batch_size], key) for i in range(0, len(records), batch_size)]
+    inserted = modified = matched = written = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(_write_batch, collection, batch): len(batch) for batch in batches}
+        for future in as_completed(futures):
+            batch_inserted, batch_modified, batch_matched = future.result()
+            inserted += batch_inserted
+            modified += batch_modified
+            matched += batch_matched
+            written += futures[future]
+            if progress is not None:
+                progress(written, len(records))
+    return {
+        'inseridos': inserted,
+        'atualizados': modified,
+        'inalterados': matched - modified,
+        'ignorados': skipped,
+    }
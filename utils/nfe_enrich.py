@@ -0,0 +1,137 @@
+import polars as pl
+
+# Mapeamento dos meses em português
+MESES_PT = {
+    1: 'janeiro', 2: 'fevereiro', 3: 'março', 4: 'abril', 5: 'maio', 6: 'junho',
+    7: 'julho', 8: 'agosto', 9: 'setembro', 10: 'outubro', 11: 'novembro', 12: 'dezembro'
+}
+
+# Colunas finais (nome interno -> nome exibido), na ordem do arquivo exportado
+RENOMEAR_COLUNAS = {
+    'nNf': 'Nota Fiscal',
+    'itemNf': 'Item Nf',
+    'nomeMaterial': 'Nome Material',
+    'ncm': 'Codigo NCM',
+    'qtd': 'Quantidade',
+    'und': 'Unidade',
+    'vlUnProd': 'Valor Unitario Produto',
+    'vlTotProd': 'Valor Total Produto',
+    'vlTotalNf': 'Valor Total Nota Fiscal',
+    'total_itens_nf': 'Total itens Nf',
+    'data nf': 'data nf',
+    'dVenc': 'Data Vencimento',
+    'chNfe': 'Chave NF-e',
+    'emitNome': 'Nome Emitente',
+    'emitCnpj': 'CNPJ Emitente',
+    'emitLogr': 'Logradouro Emitente',
+    'emitNr': 'Numero Emitente',
+    'emitCompl': 'Complemento Emitente',
+    'emitBairro': 'Bairro Emitente',
+    'emitMunic': 'Municipio Emitente',
+    'emitUf': 'UF Emitente',
+    'emitCep': 'CEP Emitente',
+    'emitPais': 'Pais Emitente',
+    'destNome': 'Nome Destinatario',
+    'destCnpj': 'CNPJ Destinatario',
+    'destLogr': 'Logradouro Destinatario',
+    'destNr': 'Numero Destinatario',
+    'destCompl': 'Complemento Destinatario',
+    'destBairro': 'Bairro Destinatario',
+    'destMunic': 'Municipio Destinatario',
+    'destUf': 'UF Destinatario',
+    'destCep': 'CEP Destinatario',
+    'destPais': 'Pais Destinatario',
+    'cfop': 'CFOP',
+    'my_categoria': 'CFOP Categoria',
+    'po': 'PO',
+    'Codigo Projeto': 'Codigo Projeto',
+    'Projeto': 'Projeto',
+    'WBS Andritz': 'WBS Andritz',
+    'Centro de Custo': 'Centro de Custo',
+    'total_invoices_per_po': 'NF recebidas PO',
+    'total_itens_po': 'Itens recebidos PO',
+    'valor_recebido_po': 'Valor Recebido PO',
+    'Codigo Projeto Envio': 'Codigo Projeto Envio',
+    'Projeto Envio': 'Projeto Envio',
+    'mes_ano': 'mes_ano',
+    'mes': 'mes',
+    'ano': 'ano',
+    'dtEmi': 'Data Emissao',
+    'tags': 'tags',
+    'unique': 'unique',
+}
+
+def _reference(frame, columns, key, key_alias):
+    """Prepara uma tabela de referência do MongoDB: renomeia colunas, converte a chave para Float64 e
+    mantém apenas a primeira linha de cada chave (evita multiplicar as linhas das notas no join)."""
+    frame = frame.lazy()
+    names = frame.collect_schema().names()
+    return (
+        frame
+        .select([pl.col(source).alias(target) if source in names else pl.lit(None).alias(target)
+                 for source, target in columns.items()])
+        .with_columns(pl.col(key).cast(pl.Float64, strict=False).alias(key_alias))
+        .filter(pl.col(key_alias).is_not_null())
+        .unique(subset=key_alias, keep='first', maintain_order=True)
+    )
+
+def build_enrichment_plan(items, polars_po, polars_cod_project, polars_cat):
+    """Monta o plano lazy de enriquecimento dos itens das NF-e.
+
+    Joins com PO, projeto e categoria, totais por nota e por PO, colunas de mês/ano, renomeação e ordenação.
+    """
+    po = _reference(
+        polars_po,
+        {'Purchasing Document': '_po', 'codigo_projeto': 'Codigo Projeto', 'Project Code': 'Projeto',
+         'Andritz WBS Element': 'WBS Andritz', 'Cost Center': 'Centro de Custo'},
+        '_po', '_po_key',
+    ).drop('_po')
+    projetos = _reference(
+        polars_cod_project,
+        {'codigo_projeto': 'Codigo Projeto Envio', 'Project Code': 'Projeto Envio'},
+        'Codigo Projeto Envio', '_projeto_key',
+    ).with_columns(pl.col('Codigo Projeto Envio').cast(pl.Float64, strict=False))
+
+    data_nf = pl.coalesce(
+        pl.col('dtEmi').str.to_datetime('%Y-%m-%dT%H:%M:%S%z', strict=False, time_zone='UTC'),
+        pl.col('dtEmi').str.to_datetime('%Y-%m-%dT%H:%M:%S', strict=False).dt.replace_time_zone('UTC'),
+    )
+    com_po = pl.col('po').is_not_null()
+
+    plan = (
+        items.lazy()
+        .with_columns(
+            pl.col('po').cast(pl.Float64, strict=False),
+            pl.col('codigo_projeto').cast(pl.Float64, strict=False),
+            data_nf.alias('data nf'),
+        )
+        .with_columns(
+            pl.col('qtd').sum().over('chNfe').alias('total_itens_nf'),
+            pl.when(com_po).then(pl.col('chNfe').n_unique().over('po')).alias('total_invoices_per_po'),
+            pl.when(com_po).then(pl.col('qtd').sum().over('po')).alias('total_itens_po'),
+            pl.when(com_po).then(pl.col('vlTotProd').sum().over('po')).alias('valor_recebido_po'),
+            pl.col('data nf').dt.strftime('%Y-%m').alias('mes_ano'),
+            pl.col('data nf').dt.strftime('%Y').alias('ano'),
+            pl.col('data nf').dt.month().replace_strict(MESES_PT, default=None, return_dtype=pl.Utf8).alias('mes'),
+            pl.col('data nf').dt.strftime('%d/%m/%Y'),
+        )
+        .join(po, left_on='po', right_on='_po_key', how='left')
+        .join(projetos, left_on='codigo_projeto', right_on='_projeto_key', how='left')
+        .select([pl.col(source).alias(target) for source, target in RENOMEAR_COLUNAS.items()])
+    )
+
+    if polars_cat is not None and 'tags' in polars_cat.columns:
+        categorias = (
+            polars_cat.lazy()
+            .with_columns(pl.col('tags').cast(pl.Utf8))
+            .unique(subset='tags', keep='first', maintain_order=True)
+        )
+        plan = plan.join(categorias, on='tags', how='left')
+
+    return plan.sort(['Data Emissao', 'Nota Fiscal', 'Item Nf'], descending=[True, False, False],
+                     nulls_last=True, maintain_order=True)
+
+def enrich_nfe(df, polars_po, polars_cod_project, polars_cat):
+    """Executa o plano de enriquecimento (coleta em streaming) sobre o DataFrame pandas dos itens e devolve pandas."""
+    plan = build_enrichment_plan(pl.from_pandas(df), polars_po, polars_cod_project, polars_cat)
+    return plan.collect(streaming=True).to_pandas()
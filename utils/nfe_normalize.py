@@ -0,0 +1,136 @@
+import re
+
+import pandas as pd
+
+from utils.br_format import format_date
+from utils.cfop import categorize_cfop
+from utils.po_extract import extract_single_po, first_po_per_key, extract_project_code
+from utils.text import slugify_series, tag_series
+
+def clean_description(description):
+    """Remove múltiplos espaços consecutivos e espaços no início e no final da string."""
+    if description is None:
+        return ""
+    description = re.sub(' +', ' ', description)
+    description = description.strip()
+    return description
+
+def normalize_nfe(df):
+    """Normaliza a tabela de itens lida dos XML: chave 'unique', tags, decimais, PO e código de projeto,
+    datas e renomeação para os nomes internos (nNf, dtEmi, emitCnpj...)."""
+    colunas = [
+        'chaveNfe', 'NFe', 'Nome Emitente', 'Descrição', 'Série', 'natOp','Data de Emissão', 'info_adic', 'dVenc', 'info_AdFisco','info_xPed',
+        'CNPJ Emitente', 'CNPJ Destinatário', 'Nome Destinatário', 'Valor NF-e', 'Valor Frete', 'Item Nota', 
+        'Cód Produto', 'Quantidade', 'Unidade Medida', 'vlUnProd', 'vlTotProd', 'ncm', 'cfop', 'xPed', 'nItemPed', 
+        'infAdProd', 'Data Importação', 'Usuário', 'Data Saída', 'Fatura', 'Duplicata', 'Valor Original', 
+        'Valor Pago', 'Logradouro Emitente', 'Número Emitente', 'Complemento Emitente', 'Bairro Emitente', 
+        'Município Emitente', 'UF Emitente', 'CEP Emitente', 'País Emitente', 'Logradouro Destinatário', 
+        'Número Destinatário', 'Complemento Destinatário', 'Bairro Destinatário', 'Município Destinatário', 
+        'UF Destinatário', 'CEP Destinatário', 'País Destinatário'
+    ]
+
+    df = df.reindex(columns=colunas)
+
+    # Create unique identifier using slugify
+    df['unique'] = df['NFe'].astype(str) + '-' + df['Item Nota'].astype(str) + '-' + df['Descrição'].astype(str)
+    df['unique'] = slugify_series(df['unique'])
+    
+    # Remove duplicates based on the slugified unique column
+    df.drop_duplicates(subset='unique', inplace=True)
+
+    df['tags'] = df['Descrição'].astype(str)
+    df['tags'] = tag_series(df['tags']).str.strip()
+    
+    # df=df_formatted
+    def convert_to_decimal(df, columns, decimal_places=2):
+        """Converte várias colunas para float (decimais) e arredonda para o número especificado de casas decimais."""
+        for column in columns:
+            # Converte para float e força valores inválidos para NaN
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(float)
+            # Arredonda para o número de casas decimais especificado
+            df[column] = df[column].round(decimal_places)
+        return df
+
+    # Supondo que você queira converter as colunas 'preco' e 'quantidade' para decimais com duas casas
+    columns_to_convert = ['Quantidade','vlUnProd','vlTotProd']
+
+    # Converter as colunas para decimal (float) com duas casas decimais
+    df = convert_to_decimal(df, columns_to_convert, decimal_places=2) 
+    
+    df['Descrição'] = df['Descrição'].apply(clean_description).str.upper()
+    
+    # Aplicar a função para filtrar e formatar a coluna 'info_adic''info_AdFisco','info_xPed'
+    df['po'] = df['info_adic'].fillna("") + " " + df['xPed'].fillna("") + " " + df['nItemPed'].fillna("") + " " + df['infAdProd'].fillna("")+ df['info_AdFisco'].fillna("") + " " + df['info_xPed'].fillna("")
+    # Extração vetorizada: PO único por linha e, em seguida, o primeiro PO de cada nota
+    df['po'] = extract_single_po(df['po'])
+    df['po'] = df['chaveNfe'].map(first_po_per_key(df['po'], df['chaveNfe']))
+
+    df['codigo_projeto'] = extract_project_code(df['info_adic'])
+      
+    def format_date_to_brazilian(df, columns):
+        """Converte as colunas para texto dd/mm/aaaa (lidas como ISO ou já em dd/mm/aaaa); inválidas viram NaN."""
+        for column in columns:
+            df[column] = format_date(df[column], formats=('%Y-%m-%d', '%d/%m/%Y'))
+        return df
+
+    # Aplicar a formatação desejada
+    df = format_date_to_brazilian(df, ['dVenc'])
+                                
+    def convert_columns_to_numeric(df, columns):
+        """Converte várias colunas para numérico, forçando erros para NaN."""
+        for column in columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        return df
+
+    # Supondo que você queira converter as colunas 'po' e 'NFe'
+    columns_to_convert = ['po','NFe','Série','CNPJ Emitente','CNPJ Destinatário','ncm','cfop','CEP Emitente','País Emitente','CEP Destinatário','País Destinatário'] 
+    
+    # Converter as colunas relevantes para numérico
+    df = convert_columns_to_numeric(df, columns_to_convert)   
+
+    # Ordenar o DataFrame pela coluna 'Data' do mais novo para o mais velho
+    df = df.sort_values(by='Data de Emissão', ascending=False)  
+
+    # Renomear as colunas
+
+    df = df.rename(columns={'NFe': 'nNf', 'Data de Emissão': 'dtEmi','Item Nota':'itemNf','Descrição':'nomeMaterial','ncm':'ncm','Quantidade':'qtd',
+                    'Unidade Medida':'und','vlUnProd':'vlUnProd','vlTotProd':'vlTotProd','Valor NF-e':'vlTotalNf',
+                    'dVenc':'dVenc','po':'po',
+                    'chaveNfe':'chNfe',
+                    'Nome Emitente': 'emitNome','CNPJ Emitente':'emitCnpj','Logradouro Emitente':'emitLogr','Número Emitente':'emitNr','Complemento Emitente':'emitCompl','Bairro Emitente':'emitBairro','Município Emitente':'emitMunic','UF Emitente':'emitUf','CEP Emitente':'emitCep','País Emitente':'emitPais',
+                    'Nome Destinatário': 'destNome','CNPJ Destinatário':'destCnpj','Logradouro Destinatário':'destLogr','Número Destinatário':'destNr','Complemento Destinatário':'destCompl','Bairro Destinatário':'destBairro','Município Destinatário':'destMunic','UF Destinatário':'destUf','CEP Destinatário':'destCep','País Destinatário':'destPais',
+                    'cfop':'cfop','tags':'tags','unique':'unique'})
+
+    # Exibir apenas as colunas renomeadas
+    colunas_renomeadas = ['nNf', 'dtEmi', 'itemNf','nomeMaterial','ncm','qtd','und','vlUnProd','vlTotProd','vlTotalNf','po','dVenc','chNfe',
+                            'emitNome','emitCnpj','emitLogr','emitNr','emitCompl','emitBairro','emitMunic','emitUf','emitCep','emitPais',
+                            'destNome','destCnpj','destLogr','destNr','destCompl','destBairro','destMunic','destUf','destCep','destPais',
+                            'cfop','tags','unique','codigo_projeto']
+    
+    df= df[colunas_renomeadas]
+
+    # Converter as colunas para string
+    df['emitCnpj'] = df['emitCnpj'].astype(str).replace('.0','')
+    df['destCnpj'] = df['destCnpj'].astype(str).replace('.0','')
+
+    # Garantir que as colunas tenham 14 dígitos
+    df['emitCnpj'] = df['emitCnpj'].str.zfill(14)
+    df['destCnpj'] = df['destCnpj'].str.zfill(14)
+
+    return df
+
+def categorize_nfe(df):
+    """Acrescenta as colunas 'categoria' e 'my_categoria' a partir da tabela de regras CFOP."""
+    # Categorização vetorizada a partir da tabela de regras CFOP (utils/cfop_categorias.csv)
+    df['categoria'] = categorize_cfop(df, 'categoria')
+    df['my_categoria'] = categorize_cfop(df, 'my_categoria')
+    
+    # Exibir apenas as colunas renomeadas
+    colunas_renomeadas = ['nNf', 'dtEmi', 'itemNf','nomeMaterial','ncm','qtd','und','vlUnProd','vlTotProd','vlTotalNf','po','dVenc','chNfe',
+                            'emitNome','emitCnpj','emitLogr','emitNr','emitCompl','emitBairro','emitMunic','emitUf','emitCep','emitPais',
+                            'destNome','destCnpj','destLogr','destNr','destCompl','destBairro','destMunic','destUf','destCep','destPais',
+                            'cfop','categoria','my_categoria','tags','unique','codigo_projeto']
+    
+    df= df[colunas_renomeadas]
+
+    return df
@@ -0,0 +1,556 @@
+import io
+import math
+import multiprocessing
+import os
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from array import array
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pyarrow as pa
+
+try:
+    # lxml é opcional: quando instalado, o parser em C acelera a leitura dos XML
+    from lxml import etree as lxml_etree
+    # Antes do lxml 5 não há resolve_entities='internal' (entidades internas resolvidas como na stdlib)
+    if lxml_etree.LXML_VERSION < (5,):
+        lxml_etree = None
+except ImportError:
+    lxml_etree = None
+
+# Abaixo deste número de arquivos o custo de subir o pool supera o ganho
+PARALLEL_MIN_FILES = 20
+
+# Chave de acesso no atributo Id de <infNFe>, que fica no início do arquivo (antes dos itens e da assinatura)
+ACCESS_KEY_PATTERN = re.compile(rb'<(?:\w+:)?infNFe\b[^>]*?\bId\s*=\s*["\']NFe(\d{44})["\']')
+ACCESS_KEY_HEAD_BYTES = 4096
+
+# Backends de parsing: 'auto' e 'lxml' usam lxml quando instalado; sem ele, ou com 'stdlib', usa xml.etree
+XML_BACKENDS = ('auto', 'lxml', 'stdlib')
+
+def decode_number(text):
+    """Converte o texto de um campo decimal da NF-e (ponto como separador) em float; vazio ou inválido vira NaN."""
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return math.nan
+
+# Namespace das NF-e e mapa declarativo dos campos (coluna -> caminho relativo a <infNFe>)
+NFE_NS = "{http://www.portalfiscal.inf.br/nfe}"
+
+NFE_HEADER_FIELDS = {
+    'NFe': 'ide/nNF',
+    'Série': 'ide/serie',
+    'natOp': 'ide/natOp',
+    'Data de Emissão': 'ide/dhEmi',
+    'info_adic': 'infAdic/infCpl',
+    'dVenc': 'cobr/dup/dVenc',
+    'info_AdFisco': 'infAdic/infAdFisco',
+    'info_xPed': 'compra/xPed',
+    'CNPJ Emitente': 'emit/CNPJ',
+    'Nome Emitente': 'emit/xNome',
+    'CNPJ Destinatário': 'dest/CNPJ',
+    'Nome Destinatário': 'dest/xNome',
+    'Valor NF-e': 'total/ICMSTot/vNF',
+    'Valor Frete': 'total/ICMSTot/vFrete',
+    'Data Importação': 'transp/vol/veicId',
+    'Usuário': 'transp/vol/placa',
+    'Data Saída': 'transp/vol/uf',
+    'Fatura': 'cobr/fat/nFat',
+    'Duplicata': 'cobr/dup/nDup',
+    'Valor Original': 'cobr/fat/vOrig',
+    'Valor Pago': 'cobr/fat/vLiq',
+    'Logradouro Emitente': 'emit/enderEmit/xLgr',
+    'Número Emitente': 'emit/enderEmit/nro',
+    'Complemento Emitente': 'emit/enderEmit/complemento',
+    'Bairro Emitente': 'emit/enderEmit/xBairro',
+    'Município Emitente': 'emit/enderEmit/xMun',
+    'UF Emitente': 'emit/enderEmit/UF',
+    'CEP Emitente': 'emit/enderEmit/CEP',
+    'País Emitente': 'emit/enderEmit/cPais',
+    'Logradouro Destinatário': 'dest/enderDest/xLgr',
+    'Número Destinatário': 'dest/enderDest/nro',
+    'Complemento Destinatário': 'dest/enderDest/complemento',
+    'Bairro Destinatário': 'dest/enderDest/xBairro',
+    'Município Destinatário': 'dest/enderDest/xMun',
+    'UF Destinatário': 'dest/enderDest/UF',
+    'CEP Destinatário': 'dest/enderDest/CEP',
+    'País Destinatário': 'dest/enderDest/cPais',
+}
+
+# Campos de cada item (caminho relativo a <det>)
+NFE_ITEM_FIELDS = {
+    'Cód Produto': 'prod/cProd',
+    'Quantidade': 'prod/qCom',
+    'Descrição': 'prod/xProd',
+    'Unidade Medida': 'prod/uCom',
+    'vlUnProd': 'prod/vUnCom',
+    'vlTotProd': 'prod/vProd',
+    'ncm': 'prod/NCM',
+    'cfop': 'prod/CFOP',
+    'xPed': 'prod/xPed',
+    'nItemPed': 'prod/nItemPed',
+    'infAdProd': 'infAdProd',
+}
+
+# Campos decimais, convertidos para float já na leitura
+NFE_NUMERIC_FIELDS = {'Valor NF-e', 'Valor Frete', 'Valor Original', 'Valor Pago', 'Quantidade', 'vlUnProd', 'vlTotProd'}
+
+# Ordem das colunas da tabela gerada por NFeTableBuilder
+NFE_COLUMNS = [
+    'chaveNfe', 'NFe', 'Série', 'natOp','Data de Emissão', 'info_adic', 'dVenc', 'info_AdFisco','info_xPed','CNPJ Emitente', 'Nome Emitente',
+    'CNPJ Destinatário', 'Nome Destinatário', 'Valor NF-e', 'Valor Frete', 'Item Nota', 'Cód Produto',
+    'Quantidade', 'Descrição', 'Unidade Medida', 'vlUnProd', 'vlTotProd', 'ncm', 'cfop' ,'xPed', 'nItemPed',
+    'infAdProd', 'Data Importação', 'Usuário', 'Data Saída', 'Fatura', 'Duplicata', 'Valor Original', 'Valor Pago',
+    'Logradouro Emitente', 'Número Emitente', 'Complemento Emitente', 'Bairro Emitente', 'Município Emitente',
+    'UF Emitente', 'CEP Emitente', 'País Emitente', 'Logradouro Destinatário', 'Número Destinatário',
+    'Complemento Destinatário', 'Bairro Destinatário', 'Município Destinatário', 'UF Destinatário',
+    'CEP Destinatário', 'País Destinatário'
+]
+
+def compile_field_map(fields):
+    """Compila o mapa coluna -> caminho em uma árvore {tag: subárvore | coluna} percorrida uma única vez."""
+    plan = {}
+    for column, path in fields.items():
+        *parents, leaf = path.split('/')
+        node = plan
+        for tag in parents:
+            node = node.setdefault(NFE_NS + tag, {})
+        node[NFE_NS + leaf] = column
+    return plan
+
+# Colunas do cabeçalho (guardadas uma vez por nota) e colunas dos itens (uma vez por linha)
+NFE_HEADER_COLUMNS = ['chaveNfe'] + list(NFE_HEADER_FIELDS)
+NFE_ITEM_COLUMNS = ['Item Nota'] + list(NFE_ITEM_FIELDS)
+
+NFE_HEADER_PLAN = compile_field_map(NFE_HEADER_FIELDS)
+NFE_ITEM_PLAN = compile_field_map(NFE_ITEM_FIELDS)
+NFE_INF_TAG = NFE_NS + 'infNFe'
+NFE_DET_TAG = NFE_NS + 'det'
+
+NFE_CFOP_PATH = f"{NFE_NS}prod/{NFE_NS}CFOP"
+
+def _digits(value):
+    return ''.join(ch for ch in str(value) if ch.isdigit())
+
+def normalize_access_key(key):
+    """Chave de acesso com 44 dígitos (sem o prefixo 'NFe'), ou None se inválida."""
+    key = _digits(key) if key is not None else ''
+    return key if len(key) == 44 else None
+
+def read_access_key(data, head=ACCESS_KEY_HEAD_BYTES):
+    """Lê a chave de acesso do início do conteúdo do XML, sem montar a árvore; None se não encontrada."""
+    match = ACCESS_KEY_PATTERN.search(data, 0, head)
+    if match is None and len(data) > head:
+        match = ACCESS_KEY_PATTERN.search(data)
+    return match.group(1).decode('ascii') if match else None
+
+class AccessKeySet:
+    """Conjunto compacto de chaves de acesso: array numpy ordenado de 44 bytes por chave, com busca binária.
+
+    Ocupa uma fração de um set de str para centenas de milhares de notas e aceita atualizações incrementais.
+    """
+
+    def __init__(self, keys=()):
+        self._keys = np.empty(0, dtype='S44')
+        self.update(keys)
+
+    def update(self, keys):
+        new = np.array([key for key in map(normalize_access_key, keys) if key], dtype='S44')
+        if len(new):
+            self._keys = np.union1d(self._keys, new)
+
+    def __contains__(self, key):
+        key = normalize_access_key(key)
+        if key is None or not len(self._keys):
+            return False
+        key = key.encode('ascii')
+        position = np.searchsorted(self._keys, key)
+        return position < len(self._keys) and self._keys[position] == key
+
+    def __len__(self):
+        return len(self._keys)
+
+class NFeFilter:
+    """Filtros aplicados durante a leitura, antes de percorrer os itens <det> de cada nota.
+
+    - dest_cnpjs: CNPJs de destinatário aceitos
+    - date_from / date_to: período de emissão (datas inclusivas, comparadas com ide/dhEmi)
+    - cfop_include / cfop_exclude: CFOPs aceitos / descartados, avaliados item a item
+    - known_keys: chaves de acesso já conhecidas (44 dígitos, com ou sem o prefixo 'NFe', ou um AccessKeySet);
+      a nota é ignorada antes do parsing
+
+    Critérios vazios (None ou conjunto vazio) não filtram nada.
+    """
+
+    def __init__(self, dest_cnpjs=None, date_from=None, date_to=None, cfop_include=None, cfop_exclude=None,
+                 known_keys=None):
+        self.dest_cnpjs = {_digits(cnpj).zfill(14) for cnpj in dest_cnpjs or ()}
+        self.date_from = date_from.isoformat()[:10] if date_from else None
+        self.date_to = date_to.isoformat()[:10] if date_to else None
+        self.cfop_include = {_digits(cfop) for cfop in cfop_include or ()}
+        self.cfop_exclude = {_digits(cfop) for cfop in cfop_exclude or ()}
+        self.known_keys = known_keys if isinstance(known_keys, AccessKeySet) else AccessKeySet(known_keys or ())
+
+    def __bool__(self):
+        return bool(self.dest_cnpjs or self.date_from or self.date_to or self.cfop_include or self.cfop_exclude
+                    or len(self.known_keys))
+
+    def fingerprint(self):
+        """Representação estável dos critérios (para chaves de cache).
+
+        As chaves conhecidas ficam de fora: elas crescem quando o próprio lote é gravado no banco.
+        """
+        return (sorted(self.dest_cnpjs), self.date_from, self.date_to, sorted(self.cfop_include),
+                sorted(self.cfop_exclude))
+
+    def is_known(self, chave):
+        return len(self.known_keys) > 0 and chave in self.known_keys
+
+    def without_known_keys(self):
+        """Cópia sem as chaves conhecidas, para os workers (a checagem das chaves é feita no processo principal)."""
+        copy = object.__new__(NFeFilter)
+        copy.__dict__.update(self.__dict__, known_keys=AccessKeySet())
+        return copy
+
+    def header_reason(self, header):
+        """Motivo para ignorar a nota pelo cabeçalho (ide/dest), ou None se ela passa."""
+        if self.dest_cnpjs and _digits(header.get('CNPJ Destinatário', '')).zfill(14) not in self.dest_cnpjs:
+            return 'destinatário'
+        if self.date_from or self.date_to:
+            emissao = header.get('Data de Emissão', '')[:10]
+            if not emissao or (self.date_from and emissao < self.date_from) or (self.date_to and emissao > self.date_to):
+                return 'data de emissão'
+        return None
+
+    def accepts_item(self, det):
+        """Testa o CFOP do item antes de extrair os demais campos."""
+        if not (self.cfop_include or self.cfop_exclude):
+            return True
+        cfop = _digits(det.findtext(NFE_CFOP_PATH) or '')
+        if self.cfop_include and cfop not in self.cfop_include:
+            return False
+        return cfop not in self.cfop_exclude
+
+def resolve_backend(backend):
+    """Backend efetivo ('lxml' ou 'stdlib') para o backend pedido, com fallback automático para a stdlib."""
+    if backend not in XML_BACKENDS:
+        raise ValueError(f"Backend XML inválido: {backend!r} (opções: {', '.join(XML_BACKENDS)})")
+    return 'lxml' if backend != 'stdlib' and lxml_etree is not None else 'stdlib'
+
+def _lxml_parser():
+    """Parser lxml sem rede e sem entidades externas (mesmo comportamento seguro do xml.etree).
+
+    Comentários e instruções de processamento são descartados como no xml.etree; mantidos, o `.text` do lxml
+    pararia no primeiro comentário dentro do elemento.
+    """
+    return lxml_etree.XMLParser(resolve_entities='internal', no_network=True, load_dtd=False,
+                                remove_comments=True, remove_pis=True)
+
+if lxml_etree is not None:
+    # <NFe>/<infNFe> compilado uma vez; equivale a root.find('NFe').find('infNFe')
+    LXML_INF_NFE = lxml_etree.XPath('n:NFe[1]/n:infNFe[1]', namespaces={'n': NFE_NS[1:-1]})
+
+def collect_fields(element, plan, out):
+    """Percorre os filhos de `element` seguindo `plan`; mantém o primeiro valor encontrado (mesma semântica de find)."""
+    for child in element:
+        node = plan.get(child.tag)
+        if node is None:
+            continue
+        if isinstance(node, dict):
+            collect_fields(child, node, out)
+        elif node not in out:
+            out[node] = child.text or ""
+    return out
+
+class ReadXML:
+    def __init__(self, files, workers=1, filters=None, backend='auto'):
+        self.files = files
+        self.workers = workers or os.cpu_count() or 1
+        self.filters = filters if filters else None
+        self.backend = resolve_backend(backend)
+        self._parser = _lxml_parser() if self.backend == 'lxml' else None
+        self.errors = []
+        # Notas ignoradas pelos filtros, por motivo
+        self.skipped = Counter()
+
+    def nfe_data(self, xml_file):
+        """Extrai os dados da NFe de um arquivo XML.
+
+        Retorna (cabecalho, itens): uma tupla na ordem de NFE_HEADER_COLUMNS e uma lista de tuplas
+        na ordem de NFE_ITEM_COLUMNS, ou None se o arquivo não contiver <NFe>/<infNFe>.
+        Com filtros, uma nota recusada retorna o motivo (str) sem que seus itens sejam percorridos.
+        """
+        # <nfeProc>/<NFe>/<infNFe>: sem esse caminho a nota não possui itens
+        infNFe = self._find_inf_nfe(xml_file)
+        if infNFe is None:
+            return None
+
+        header = {'chaveNfe': infNFe.attrib.get('Id', '')}
+        filters = self.filters
+        if filters is not None and filters.is_known(header['chaveNfe']):
+            return 'chave já conhecida'
+
+        # Uma única passagem pelos filhos de <infNFe>: cabeçalho (ide/emit/dest/cobr/total/...) e itens <det>
+        dets = []
+        for child in infNFe:
+            if child.tag == NFE_DET_TAG:
+                dets.append(child)
+                continue
+            node = NFE_HEADER_PLAN.get(child.tag)
+            if node is not None:
+                collect_fields(child, node, header)
+
+        if filters is not None:
+            reason = filters.header_reason(header)
+            if reason is not None:
+                return reason
+
+        itens = []
+        for itemNota, item in enumerate(dets, start=1):
+            # Item Nota mantém a posição original mesmo quando itens anteriores são filtrados pelo CFOP
+            if filters is not None and not filters.accepts_item(item):
+                continue
+            fields = collect_fields(item, NFE_ITEM_PLAN, {'Item Nota': itemNota})
+            itens.append(tuple(self._decode(column, fields.get(column, "")) for column in NFE_ITEM_COLUMNS))
+
+        if filters is not None and dets and not itens:
+            return 'cfop'
+        cabecalho = tuple(self._decode(column, header.get(column, "")) for column in NFE_HEADER_COLUMNS)
+        return cabecalho, itens
+
+    def _find_inf_nfe(self, xml_file):
+        """Faz o parsing com o backend configurado e retorna o elemento <infNFe> (ou None).
+
+        Os dois backends entregam elementos com a mesma interface (tag, text, attrib e iteração pelos filhos),
+        então a extração dos campos é a mesma passagem compilada de collect_fields.
+        """
+        if self._parser is not None:
+            found = LXML_INF_NFE(lxml_etree.parse(xml_file, self._parser).getroot())
+            return found[0] if found else None
+        root = ET.parse(xml_file).getroot()
+        nfe = root.find(NFE_NS + 'NFe')
+        return nfe.find(NFE_INF_TAG) if nfe is not None else None
+
+    @staticmethod
+    def _decode(column, value):
+        return decode_number(value) if column in NFE_NUMERIC_FIELDS else value
+
+    def process_xml_files(self, progress=None):
+        """Processa todos os arquivos XML carregados (e os XML dentro de arquivos .zip), em paralelo quando workers > 1.
+
+        `progress`, se informado, é chamado como progress(arquivos_lidos, total_arquivos, itens) após cada XML.
+        Retorna um NFeTableBuilder com as linhas de todas as notas.
+        """
+        self.errors = []
+        self.skipped = Counter()
+        builder = NFeTableBuilder()
+        total = self.count_sources() if progress is not None else 0
+        sources = self._iter_sources()
+        if self.workers > 1 and self._worth_parallel():
+            results = self._parse_parallel(sources)
+        else:
+            results = ((name, self._parse_bytes(self._read_bytes(source))) for name, source in sources)
+
+        for done, (name, (invoice, error)) in enumerate(results, 1):
+            if error is not None:
+                self.errors.append((name, error))
+            elif isinstance(invoice, str):
+                self.skipped[invoice] += 1
+            elif invoice is not None:
+                builder.add(*invoice)
+            if progress is not None:
+                progress(done, total, len(builder))
+        return builder
+
+    def count_sources(self):
+        """Quantidade de XML a processar; nos .zip lê apenas o diretório central, sem descompactar."""
+        total = 0
+        for uploaded_file in self.files:
+            if not self._is_zip(uploaded_file):
+                total += 1
+                continue
+            try:
+                with zipfile.ZipFile(uploaded_file) as archive:
+                    total += sum(1 for info in archive.infolist()
+                                 if not info.is_dir() and info.filename.lower().endswith('.xml'))
+            except zipfile.BadZipFile:
+                pass
+            finally:
+                if hasattr(uploaded_file, "seek"):
+                    uploaded_file.seek(0)
+        return total
+
+    def _worth_parallel(self):
+        return len(self.files) >= PARALLEL_MIN_FILES or any(self._is_zip(f) for f in self.files)
+
+    def _iter_sources(self):
+        """Gera (nome, arquivo) para cada XML; membros de .zip são abertos um a um, sem extrair para o disco."""
+        for uploaded_file in self.files:
+            name = self._file_name(uploaded_file)
+            if not self._is_zip(uploaded_file):
+                yield name, uploaded_file
+                continue
+            try:
+                with zipfile.ZipFile(uploaded_file) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not info.filename.lower().endswith('.xml'):
+                            continue
+                        with archive.open(info) as member:
+                            yield f"{name}/{info.filename}", member
+            except zipfile.BadZipFile as e:
+                self.errors.append((name, f"{type(e).__name__}: {e}"))
+
+    def _parse_source(self, source):
+        try:
+            return self.nfe_data(source), None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+
+    def _known_key_result(self, data):
+        """Resultado antecipado para notas cuja chave de acesso (lida no início do arquivo) já é conhecida."""
+        if self.filters is not None and len(self.filters.known_keys):
+            chave = read_access_key(data)
+            if chave is not None and chave in self.filters.known_keys:
+                return 'chave já conhecida', None
+        return None
+
+    def _parse_bytes(self, data):
+        return self._known_key_result(data) or self._parse_source(io.BytesIO(data))
+
+    def _parse_parallel(self, sources):
+        """Envia o conteúdo de cada XML a um pool de processos, com no máximo `workers * 4` arquivos em memória.
+
+        Os resultados são devolvidos na ordem do upload. Se um processo do pool morrer (ex.: falta de memória),
+        os arquivos que estavam no pool viram erro e os demais são lidos neste processo.
+        """
+        window = self.workers * 4
+        pending = deque()
+        broken = False
+
+        def result(future):
+            nonlocal broken
+            try:
+                return future.result()
+            except BrokenProcessPool as e:
+                broken = True
+                return None, f"{type(e).__name__}: {e}"
+
+        # spawn evita herdar as threads do servidor do Streamlit via fork
+        context = multiprocessing.get_context("spawn")
+        worker_filters = self.filters.without_known_keys() if self.filters is not None else None
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                 initializer=_init_worker, initargs=(worker_filters, self.backend)) as executor:
+            for name, source in sources:
+                data = self._read_bytes(source)
+                known = self._known_key_result(data)
+                future = None
+                if known is None and not broken:
+                    try:
+                        future = executor.submit(parse_xml_bytes, data)
+                    except BrokenProcessPool:
+                        broken = True
+                if future is None:
+                    # Nota já conhecida (nem é enviada ao pool) ou pool encerrado: resultado pronto, na mesma ordem
+                    future = Future()
+                    future.set_result(known if known is not None else self._parse_source(io.BytesIO(data)))
+                pending.append((name, future))
+                if len(pending) >= window:
+                    name, future = pending.popleft()
+                    yield name, result(future)
+            while pending:
+                name, future = pending.popleft()
+                yield name, result(future)
+
+    @staticmethod
+    def _read_bytes(uploaded_file):
+        if isinstance(uploaded_file, (bytes, bytearray)):
+            return bytes(uploaded_file)
+        if hasattr(uploaded_file, "getvalue"):
+            return uploaded_file.getvalue()
+        return uploaded_file.read()
+
+    @staticmethod
+    def _file_name(uploaded_file):
+        return getattr(uploaded_file, "name", "")
+
+    @staticmethod
+    def _is_zip(uploaded_file):
+        return ReadXML._file_name(uploaded_file).lower().endswith('.zip')
+
+class NFeTableBuilder:
+    """Acumula as notas em buffers colunares tipados.
+
+    Os campos do cabeçalho são guardados uma única vez por nota e expandidos para as linhas
+    como colunas Arrow com dictionary encoding; valores decimais ficam em buffers float64.
+    """
+
+    def __init__(self):
+        self.header = {column: [] for column in NFE_HEADER_COLUMNS}
+        self.items = {
+            column: array('d') if column in NFE_NUMERIC_FIELDS else array('q') if column == 'Item Nota' else []
+            for column in NFE_ITEM_COLUMNS
+        }
+        # Índice da nota (posição nos buffers do cabeçalho) de cada linha
+        self.invoice_index = array('q')
+        self.invoices = 0
+
+    def __len__(self):
+        return len(self.invoice_index)
+
+    def add(self, cabecalho, itens):
+        """Adiciona uma nota; notas sem itens não geram linhas e são descartadas."""
+        if not itens:
+            return
+        for column, value in zip(NFE_HEADER_COLUMNS, cabecalho):
+            self.header[column].append(value)
+        for item in itens:
+            for column, value in zip(NFE_ITEM_COLUMNS, item):
+                self.items[column].append(value)
+        self.invoice_index.extend([self.invoices] * len(itens))
+        self.invoices += 1
+
+    def to_arrow(self):
+        """Monta a pa.Table na ordem de NFE_COLUMNS."""
+        rows = pa.array(self.invoice_index, type=pa.int64())
+        arrays = {}
+        for column, values in self.header.items():
+            if column in NFE_NUMERIC_FIELDS:
+                arrays[column] = pa.array(values, type=pa.float64()).take(rows)
+            else:
+                encoded = pa.array(values, type=pa.string()).dictionary_encode()
+                arrays[column] = pa.DictionaryArray.from_arrays(encoded.indices.take(rows), encoded.dictionary)
+        for column, values in self.items.items():
+            if column in NFE_NUMERIC_FIELDS:
+                arrays[column] = pa.array(values, type=pa.float64())
+            elif column == 'Item Nota':
+                arrays[column] = pa.array(values, type=pa.int64())
+            else:
+                arrays[column] = pa.array(values, type=pa.string())
+        return pa.table({column: arrays[column] for column in NFE_COLUMNS})
+
+    def to_pandas(self):
+        """Converte para pandas com colunas de texto comuns; valores repetidos compartilham o mesmo objeto str."""
+        table = self.to_arrow()
+        columns = [
+            column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column
+            for column in table.columns
+        ]
+        return pa.table(columns, names=table.column_names).to_pandas(deduplicate_objects=True)
+
+# Filtros do processo worker, enviados uma única vez na criação do pool (e não a cada arquivo)
+_WORKER_FILTERS = None
+_WORKER_BACKEND = 'auto'
+
+def _init_worker(filters, backend):
+    global _WORKER_FILTERS, _WORKER_BACKEND
+    _WORKER_FILTERS = filters
+    _WORKER_BACKEND = backend
+
+def parse_xml_bytes(data):
+    """Worker do pool: retorna (nota, erro) para o conteúdo de um arquivo XML sem propagar exceções."""
+    return ReadXML([], filters=_WORKER_FILTERS, backend=_WORKER_BACKEND)._parse_source(io.BytesIO(data))
@@ -0,0 +1,423 @@
+import io
+import multiprocessing
+import re
+import signal
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import closing, contextmanager
+
+import pdfplumber
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pypdfium2 é opcional
+    pdfium = None
+
+# Abaixo deste número de PDFs o custo de subir o pool (importar o pdfplumber em cada processo) supera o ganho
+PARALLEL_MIN_FILES = 4
+
+# Leitores do texto dos PDFs:
+#   'pdfium'     - pypdfium2 (PDFium em C), muito mais rápido que a análise de layout do pdfplumber
+#   'pdfplumber' - extract_text do pdfplumber (Python puro); padrão, o texto de referência da extração
+#   'auto'       - pdfium se instalado, senão pdfplumber
+PDF_BACKENDS = ('auto', 'pdfium', 'pdfplumber')
+
+# Tempo extra que o processo principal espera além do limite por arquivo (subida dos processos do pool)
+_STARTUP_MARGIN = 30
+
+# Field mapping dictionary to handle different variations
+FIELD_MAPPINGS = {
+    "numero_nf": [
+        r"NFS-e\s*:?\s*([\d]+)",
+        r"Número da\s*NFS-e\s*:?\s*([\d]+)",
+        r"Nº da Nota\s*:?\s*([\d]+)",
+        r"Número\s*:?\s*([\d]+)"
+    ],
+    "data_emissao": [
+        r"Data e Hora da Emissão\s*:?\s*([\d]{1,2}/[\d]{1,2}/[\d]{4}\s+\d{1,2}:\d{2})",
+        r"Emissão da NFS-e\s*:?\s*([\d]{1,2}/[\d]{1,2}/[\d]{4}\s+\d{1,2}:\d{2})",
+        r"Data de Emissão\s*:?\s*([\d]{1,2}/[\d]{1,2}/[\d]{4}\s+\d{1,2}:\d{2})"
+    ],
+    "competencia": [
+        r"Competência\s*:?\s*([^\n]+)",
+        r"Mês de Competência\s*:?\s*([^\n]+)",
+        r"Período de Competência\s*:?\s*([^\n]+)"
+    ],
+    "codigo_verificacao": [
+        r"Código de Verificação\s*:?\s*([^\n]+)",
+        r"Código Verificador\s*:?\s*([^\n]+)",
+        r"Código de Autenticidade\s*:?\s*([^\n]+)"
+    ],
+    "numero_rps": [
+        r"Número do RPS\s*:?\s*([\d]+)",
+        r"RPS Nº\s*:?\s*([\d]+)"
+    ],
+    "nf_substituida": [
+        r"No\. da NFS-e substituída\s*:?\s*([\d]+)",
+        r"NFS-e substituída\s*:?\s*([\d]+)"
+    ],
+    "prestador_nome": [
+        r"Razão Social/Nome\s*:?\s*([^\n]+)",
+        r"Nome/Razão Social\s*:?\s*([^\n]+)",
+        r"Prestador de Serviço\s*:?\s*([^\n]+)"
+    ],
+    "prestador_cnpj": [
+        r"CNPJ/CPF\s*:?\s*([\d\.\-/]+)",
+        r"CPF/CNPJ\s*:?\s*([\d\.\-/]+)",
+        r"CNPJ\s*:?\s*([\d\.\-/]+)"
+    ],
+    "prestador_telefone": [
+        r"Telefone\s*:?\s*([\d\(\)\s\-]+)",
+        r"Fone\s*:?\s*([\d\(\)\s\-]+)",
+        r"Tel\s*:?\s*([\d\(\)\s\-]+)"
+    ],
+    "prestador_email": [
+        r"e-mail\s*:?\s*([\w\.\-]+@[\w\.\-]+)",
+        r"E-mail\s*:?\s*([\w\.\-]+@[\w\.\-]+)",
+        r"Email\s*:?\s*([\w\.\-]+@[\w\.\-]+)"
+    ],
+    "tomador_nome": [
+        r"Tomador de Serviço\s*Razão Social/Nome\s*:?\s*([^\n]+)",
+        r"Nome/Razão Social do Tomador\s*:?\s*([^\n]+)",
+        r"Tomador\s*:?\s*([^\n]+)"
+    ],
+    "tomador_cnpj": [
+        r"CNPJ/CPF do Tomador\s*:?\s*([\d\.\-/]+)",
+        r"CPF/CNPJ do Tomador\s*:?\s*([\d\.\-/]+)",
+        r"CNPJ Tomador\s*:?\s*([\d\.\-/]+)"
+    ],
+    "tomador_endereco": [
+        r"Endereço e CEP\s*:?\s*([^\n]+)",
+        r"Endereço Tomador\s*:?\s*([^\n]+)"
+    ],
+    "tomador_telefone": [
+        r"Telefone Tomador\s*:?\s*([\d\(\)\s\-]+)",
+        r"Fone Tomador\s*:?\s*([\d\(\)\s\-]+)"
+    ],
+    "tomador_email": [
+        r"e-mail Tomador\s*:?\s*([\w\.\-]+@[\w\.\-]+)",
+        r"Email Tomador\s*:?\s*([\w\.\-]+@[\w\.\-]+)"
+    ],
+    "discriminacao_servico": [
+        r"Discriminação (do|dos) Serviço(s)?\s*(.+?)(?=Código do Serviço|Detalhamento Específico|Tributos Federais|Valor do Serviço)",
+        r"Descrição dos Serviços\s*(.+?)(?=Código|Valor|Tributos)",
+        r"Descrição\s*(.+?)(?=Código|Valor|Tributos)"
+    ],
+    "codigo_servico": [
+        r"Código do Serviço\s*/\s*Atividade\s*([^\n]+)",
+        r"Código Serviço\s*:?\s*([^\n]+)"
+    ],
+    "detalhamento_especifico": [
+        r"Detalhamento Específico da Construção Civil\s*([^\n]+)",
+        r"Detalhamento Específico\s*:?\s*([^\n]+)"
+    ],
+    "codigo_obra": [
+        r"Código da Obra\s*([^\n]+)",
+        r"Código Obra\s*:?\s*([^\n]+)"
+    ],
+    "codigo_art": [
+        r"Código ART\s*([^\n]+)",
+        r"ART\s*:?\s*([^\n]+)"
+    ],
+    "tributos_federais": [
+        r"Tributos Federais\s*([^\n]+)",
+        r"Tributos Fed\.\s*:?\s*([^\n]+)"
+    ],
+    "valor_servico": [
+        r"Valor (do|dos) Serviço(s)?\s*R\$\s*([\d\.,]+)",
+        r"Valor Total\s*R\$\s*([\d\.,]+)",
+        r"Total da Nota\s*R\$\s*([\d\.,]+)",
+        r"Valor do Serviço\s*[\r\n]+\s*([\d\.,]+)",  # New pattern for your PDF format
+        r"Valor do Serviço\s*([\d\.,]+)"  # Alternative pattern without newline
+    ],
+    "desconto_incondicionado": [
+        r"Desconto Incondicionado\s*R\$\s*([\d\.,]+)",
+        r"Desc\. Incond\.\s*R\$\s*([\d\.,]+)"
+    ],
+    "desconto_condicionado": [
+        r"Desconto Condicionado\s*R\$\s*([\d\.,]+)",
+        r"Desc\. Cond\.\s*R\$\s*([\d\.,]+)"
+    ],
+    "retencao_federal": [
+        r"Retenções Federais\s*R\$\s*([\d\.,]+)",
+        r"Ret\. Federais\s*R\$\s*([\d\.,]+)"
+    ],
+    "issqn_retido": [
+        r"ISSQN Retido\s*R\$\s*([\d\.,]+)",
+        r"ISS Retido\s*R\$\s*([\d\.,]+)"
+    ],
+    "valor_liquido": [
+        r"Valor Líquido\s*R\$\s*([\d\.,]+)",
+        r"Líquido\s*R\$\s*([\d\.,]+)"
+    ],
+    "regime_tributacao": [
+        r"Regime Especial Tributação\s*([^\n]+)",
+        r"Regime Tributário\s*:?\s*([^\n]+)"
+    ],
+    "simples_nacional": [
+        r"Opção Simples Nacional\s*([^\n]+)",
+        r"Simples Nacional\s*:?\s*([^\n]+)"
+    ],
+    "incentivador_cultural": [
+        r"Incentivador Cultural\s*([^\n]+)",
+        r"Inc\. Cultural\s*:?\s*([^\n]+)"
+    ],
+    "avisos": [
+        r"Avisos\s*([^\n]+)",
+        r"Observações\s*:?\s*([^\n]+)"
+    ]
+}
+
+def extract_field(text, field_key):
+    """Extract field value using multiple possible patterns"""
+    if not text:
+        return None
+    patterns = FIELD_MAPPINGS.get(field_key, [])
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        if match:
+            return match.group(match.lastindex).strip()
+    return None
+
+# Coluna do resultado -> campo de FIELD_MAPPINGS, na ordem das colunas
+NFSE_FIELDS = {
+    "Numero NFS-e": "numero_nf",
+    "Data Emissão": "data_emissao",
+    "Competencia": "competencia",
+    "Codigo de Verificacao": "codigo_verificacao",
+    "Numero RPS": "numero_rps",
+    "NF-e Substituida": "nf_substituida",
+    "Razao Social Prestador": "prestador_nome",
+    "CNPJ Prestador": "prestador_cnpj",
+    "Telefone Prestador": "prestador_telefone",
+    "Email Prestador": "prestador_email",
+    "Razao Social Tomador": "tomador_nome",
+    "CNPJ Tomador": "tomador_cnpj",
+    "Endereco Tomador": "tomador_endereco",
+    "Telefone Tomador": "tomador_telefone",
+    "Email Tomador": "tomador_email",
+    "Discriminacao do Servico": "discriminacao_servico",
+    "Codigo Servico": "codigo_servico",
+    "Detalhamento Especifico": "detalhamento_especifico",
+    "Codigo da Obra": "codigo_obra",
+    "Codigo ART": "codigo_art",
+    "Tributos Federais": "tributos_federais",
+    "Valor do Servico": "valor_servico",
+    "Desconto Incondicionado": "desconto_incondicionado",
+    "Desconto Condicionado": "desconto_condicionado",
+    "Retencao Federal": "retencao_federal",
+    "ISSQN Retido": "issqn_retido",
+    "Valor Liquido": "valor_liquido",
+    "Regime Especial Tributacao": "regime_tributacao",
+    "Simples Nacional": "simples_nacional",
+    "Incentivador Cultural": "incentivador_cultural",
+    "Avisos": "avisos",
+}
+
+# Campos usados pela página (chave, datas, prestador, PO e valores): a leitura das páginas para quando todos
+# aparecem no texto lido; os demais campos são procurados só nas páginas lidas até ali
+REQUIRED_FIELDS = (
+    "numero_nf", "data_emissao", "prestador_nome", "prestador_cnpj",
+    "discriminacao_servico", "valor_servico", "valor_liquido",
+)
+
+class ExtractionTimeout(BaseException):
+    """Leitura de um PDF passou do limite de tempo.
+
+    Deriva de BaseException para não ser engolida pelos `except Exception` internos do pdfminer.
+    """
+
+def empty_record(name):
+    """Registro de uma NFS-e com todos os campos vazios (usado também para os arquivos com erro)."""
+    record = dict.fromkeys(NFSE_FIELDS)
+    record["Nome do Arquivo"] = name
+    return record
+
+def resolve_backend(backend):
+    """Leitor efetivo para o leitor pedido; sem pypdfium2, 'auto' e 'pdfium' usam o pdfplumber."""
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Leitor de PDF inválido: {backend!r} (opções: {', '.join(PDF_BACKENDS)})")
+    if backend in ('auto', 'pdfium'):
+        return 'pdfium' if pdfium is not None else 'pdfplumber'
+    return backend
+
+def pdf_text(data, backend='pdfplumber', required=REQUIRED_FIELDS):
+    """Texto das páginas do PDF (bytes), lido direto da memória e concatenado como no extract_text original.
+
+    A leitura para na primeira página em que todos os campos de `required` já foram encontrados (anexos
+    longos não são lidos); com `required=None` todas as páginas são lidas.
+    """
+    text = ""
+    # Campos ainda não encontrados: um campo achado continua achado quando o texto cresce, então só os que
+    # faltam são procurados a cada página, e só na página nova e na anterior (um valor entre duas páginas
+    # ainda é achado); assim um campo que nunca aparece custa uma busca por página, não uma no texto todo.
+    # Um campo espalhado por mais de duas páginas não interrompe a leitura, que segue até o fim.
+    missing = set(required or ())
+    previous = ""
+    with closing(_PAGE_READERS[backend](data)) as pages:
+        for page_text in pages:
+            text += page_text
+            if required:
+                window = previous + page_text
+                missing = {field_key for field_key in missing if extract_field(window, field_key) is None}
+                if not missing:
+                    break
+            previous = page_text
+    return text
+
+def _pdfium_pages(data):
+    pdf = pdfium.PdfDocument(data)
+    try:
+        for index in range(len(pdf)):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                # PDFium separa as linhas com \r\n; os padrões esperam \n, como no pdfplumber
+                yield textpage.get_text_bounded().replace('\r\n', '\n')
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+def _pdfplumber_pages(data):
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages:
+            try:
+                yield page.extract_text() or ""
+            finally:
+                # Libera os objetos da página já lida
+                page.close()
+
+_PAGE_READERS = {'pdfium': _pdfium_pages, 'pdfplumber': _pdfplumber_pages}
+
+def extract_nfse(data, name, timeout=None, backend='pdfplumber', required=REQUIRED_FIELDS):
+    """Campos de uma NFS-e em PDF (bytes), lidas com o leitor `backend` até encontrar os campos de `required`
+    (pdf_text). Retorna (registro, erro); com erro, os campos ficam vazios.
+
+    `timeout` (segundos) só é aplicado quando a chamada roda na thread principal de um sistema com SIGALRM,
+    como nos processos do pool de read_nfse_pdfs.
+    """
+    record = empty_record(name)
+    try:
+        with _time_limit(timeout):
+            text = pdf_text(data, backend, required)
+    except ExtractionTimeout:
+        return record, f"tempo limite de {timeout}s excedido"
+    except Exception as e:
+        return record, f"{type(e).__name__}: {e}"
+    if not text:
+        return record, "Falha ao extrair texto do PDF"
+    for column, field_key in NFSE_FIELDS.items():
+        record[column] = extract_field(text, field_key)
+    return record, None
+
+def read_nfse_pdfs(files, workers=1, timeout=60, backend='pdfplumber', required=REQUIRED_FIELDS, progress=None):
+    """Extrai as NFS-e de vários PDFs enviados (UploadedFile ou bytes com `.name`), em paralelo quando `workers` > 1.
+
+    Cada PDF é enviado a um pool de processos (o pdfplumber é Python puro e usa um núcleo por arquivo), com
+    no máximo `workers * 2` arquivos em memória. Um PDF que passa de `timeout` segundos ou falha vira um
+    registro vazio e entra na lista de erros, sem interromper os demais.
+    `backend` é um de PDF_BACKENDS e `required` os campos que encerram a leitura das páginas (pdf_text).
+    `progress(arquivos_lidos, total, nome)` é chamado a cada arquivo concluído.
+    Retorna (registros, erros): os registros na ordem do upload e os erros como (nome, mensagem).
+    """
+    backend = resolve_backend(backend)
+    files = list(files)
+    records, errors = [], []
+    if workers > 1 and len(files) >= PARALLEL_MIN_FILES:
+        results = _extract_parallel(files, workers, timeout, backend, required)
+    else:
+        results = (extract_nfse(_file_bytes(file), _file_name(file), timeout, backend, required) for file in files)
+    for done, (file, (record, error)) in enumerate(zip(files, results), 1):
+        records.append(record)
+        if error is not None:
+            errors.append((_file_name(file), error))
+        if progress is not None:
+            progress(done, len(files), _file_name(file))
+    return records, errors
+
+def _extract_parallel(files, workers, timeout, backend, required):
+    """(registro, erro) de cada arquivo, na ordem do upload, extraídos num pool de processos.
+
+    O limite de cada arquivo é aplicado dentro do processo (SIGALRM). Onde não há SIGALRM (Windows), o
+    processo principal deixa de esperar o arquivo depois de `timeout` mais a margem de subida do pool; os
+    processos do pool são encerrados (o travado não tem como ser interrompido) e os arquivos que estavam em
+    andamento são reenviados a um pool novo.
+    """
+    window = workers * 2
+    wait = None if timeout is None else timeout + _STARTUP_MARGIN
+    pending = deque()
+    # spawn evita herdar as threads do servidor do Streamlit via fork
+    context = multiprocessing.get_context("spawn")
+    size = min(workers, len(files))
+    executor = ProcessPoolExecutor(max_workers=size, mp_context=context)
+
+    def submit(name, data):
+        return executor.submit(extract_nfse, data, name, timeout, backend, required)
+
+    def restart():
+        nonlocal executor
+        _terminate(executor)
+        executor = ProcessPoolExecutor(max_workers=size, mp_context=context)
+        for position, (name, data, _) in enumerate(pending):
+            pending[position] = (name, data, submit(name, data))
+
+    def result():
+        # O primeiro da fila é o envio mais antigo ainda em aberto, então já está em execução
+        name, _, future = pending.popleft()
+        try:
+            return future.result(timeout=wait)
+        except FutureTimeoutError:
+            restart()
+            return empty_record(name), f"tempo limite de {timeout}s excedido"
+        except Exception as e:
+            # Processo do pool encerrado (ex.: falta de memória): os demais arquivos seguem com erro
+            return empty_record(name), f"{type(e).__name__}: {e}"
+
+    try:
+        for file in files:
+            name, data = _file_name(file), _file_bytes(file)
+            pending.append((name, data, submit(name, data)))
+            if len(pending) >= window:
+                yield result()
+        while pending:
+            yield result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _terminate(executor):
+    """Encerra os processos do pool sem esperar as tarefas em andamento."""
+    # O ProcessPoolExecutor não tem API pública para matar os processos; _processes é {pid: Process}
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+@contextmanager
+def _time_limit(seconds):
+    """Interrompe o bloco com ExtractionTimeout depois de `seconds`, quando há SIGALRM e na thread principal."""
+    if not seconds or not hasattr(signal, 'SIGALRM') or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+def _expired(signum, frame):
+    raise ExtractionTimeout()
+
+def _file_bytes(file):
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    return file.read()
+
+def _file_name(file):
+    return getattr(file, "name", "")
@@ -0,0 +1,203 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# Muda quando o formato gravado, a leitura das planilhas ou o preparo (po_schema) mudam, invalidando os
+# arquivos antigos
+CACHE_VERSION = 2
+
+METADATA_KEY = b'po_cache'
+
+# Tipos Python aceitos nas colunas object (texto e números misturados, vazios como NaN ou None)
+_NONE, _STR, _INT, _FLOAT, _BOOL, _DATETIME = range(6)
+_TAGS = {type(None): _NONE, str: _STR, int: _INT, float: _FLOAT, bool: _BOOL, datetime.datetime: _DATETIME}
+_ARROW_TYPES = {_STR: pa.string(), _INT: pa.int64(), _FLOAT: pa.float64(), _BOOL: pa.bool_(),
+                _DATETIME: pa.timestamp('us')}
+
+# Tipos do pandas com vazios (NA) próprios, gravados direto no Arrow (category vira dictionary)
+_EXTENSION_TYPES = {'Int64': pa.int64(), 'string': pa.string()}
+
+class UnsupportedFrame(ValueError):
+    """DataFrame que não pode ser gravado no cache sem perder tipos (é lido de novo da planilha)."""
+
+class WorkbookCache:
+    """Cache em disco das planilhas de PO já lidas, em Parquet, pela chave do conteúdo do arquivo.
+
+    Os arquivos ficam em `directory` e os menos usados (data de modificação, atualizada a cada leitura)
+    são apagados quando o total passa de `max_bytes`. A gravação é atômica, então várias sessões podem
+    usar o mesmo diretório. O DataFrame devolvido é igual ao da leitura original, inclusive os tipos
+    Python das colunas com texto e números misturados (ex.: rodapé "Total" na coluna da PO).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(data, columns=None, engine='', prepare=''):
+        """Chave da planilha: hash do conteúdo, das colunas lidas, do leitor e do preparo aplicado (nome)."""
+        key = hashlib.blake2b(data, digest_size=16)
+        key.update(repr((CACHE_VERSION, None if columns is None else sorted(columns), engine, prepare)).encode('utf-8'))
+        return key.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key):
+        """DataFrame guardado para `key`, ou None se não estiver no cache (ou o arquivo estiver ilegível)."""
+        path = self._path(key)
+        try:
+            table = pq.read_table(path)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Cache de planilhas ilegível ({path}): {str(e)}")
+            self._remove(path)
+            return None
+        return decode_frame(table)
+
+    def put(self, key, df):
+        """Grava `df` no cache; retorna False se o DataFrame não for suportado ou não couber no limite."""
+        try:
+            table = encode_frame(df)
+        except UnsupportedFrame as e:
+            logger.info(f"Planilha fora do cache: {str(e)}")
+            return False
+        fd, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pq.write_table(table, f, compression='zstd')
+            if os.path.getsize(temporary) > self.max_bytes:
+                self._remove(temporary)
+                return False
+            os.replace(temporary, self._path(key))
+        except Exception:
+            self._remove(temporary)
+            raise
+        self.evict()
+        return True
+
+    def evict(self):
+        """Apaga os arquivos menos usados até o total caber em `max_bytes`."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.parquet'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.parquet'):
+                self._remove(entry.path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def encode_frame(df):
+    """Tabela Arrow com o conteúdo de `df` e a descrição das colunas (nomes, dtypes e codificação)."""
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        raise UnsupportedFrame("índice diferente de 0..n-1")
+    arrays, names, columns = [], [], []
+    for position, name in enumerate(df.columns):
+        if not isinstance(name, str):
+            raise UnsupportedFrame(f"nome de coluna não textual: {name!r}")
+        series = df.iloc[:, position]
+        if series.dtype == object:
+            if pd.api.types.infer_dtype(series, skipna=False) == 'string':
+                kind = 'text'
+                arrays.append(pa.array(series.to_numpy(), type=pa.string()))
+                names.append(str(position))
+            else:
+                kind = 'mixed'
+                for suffix, array in _encode_mixed(series.to_numpy(), name):
+                    arrays.append(array)
+                    names.append(f"{position}:{suffix}")
+        elif series.dtype.kind in 'iufbM' or str(series.dtype) in _EXTENSION_TYPES \
+                or isinstance(series.dtype, pd.CategoricalDtype):
+            kind = 'plain'
+            arrays.append(pa.Array.from_pandas(series))
+            names.append(str(position))
+        else:
+            raise UnsupportedFrame(f"coluna {name!r} com dtype {series.dtype}")
+        columns.append({'name': name, 'dtype': str(series.dtype), 'kind': kind})
+    metadata = {'rows': len(df), 'columns': columns}
+    schema = pa.schema([pa.field(name, array.type) for name, array in zip(names, arrays)],
+                       metadata={METADATA_KEY: json.dumps(metadata).encode('utf-8')})
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _encode_mixed(values, name):
+    """Coluna object como o tipo de cada valor mais uma coluna Arrow por tipo presente."""
+    try:
+        tags = np.fromiter((_TAGS[type(value)] for value in values), dtype=np.int8, count=len(values))
+    except KeyError as e:
+        raise UnsupportedFrame(f"coluna {name!r} com valor do tipo {e.args[0].__name__}") from None
+    yield 'tag', pa.array(tags)
+    for tag in np.unique(tags):
+        if tag == _NONE:
+            continue
+        try:
+            array = pa.array(np.where(tags == tag, values, None), type=_ARROW_TYPES[tag])
+        except (OverflowError, pa.ArrowInvalid) as e:
+            raise UnsupportedFrame(f"coluna {name!r}: {str(e)}") from None
+        yield str(tag), array
+
+def decode_frame(table):
+    """DataFrame gravado por encode_frame."""
+    metadata = json.loads(table.schema.metadata[METADATA_KEY])
+    data = {}
+    for position, column in enumerate(metadata['columns']):
+        if column['kind'] == 'mixed':
+            values = _decode_mixed(table, position, metadata['rows'])
+        elif column['kind'] == 'text':
+            values = table.column(str(position)).to_numpy(zero_copy_only=False)
+        else:
+            values = table.column(str(position)).to_pandas(types_mapper=_pandas_type(column['dtype']))
+            if str(values.dtype) != column['dtype']:
+                values = values.astype(column['dtype'], copy=False)
+        data[position] = pd.Series(values, copy=False)
+    df = pd.DataFrame(data, index=pd.RangeIndex(metadata['rows']))
+    df.columns = pd.Index([column['name'] for column in metadata['columns']], dtype=object)
+    return df
+
+def _pandas_type(dtype):
+    """types_mapper do to_pandas para as colunas Int64 e string (sem passar por float/object)."""
+    if dtype not in _EXTENSION_TYPES:
+        return None
+    return {_EXTENSION_TYPES[dtype]: pd.api.types.pandas_dtype(dtype)}.get
+
+def _decode_mixed(table, position, rows):
+    tags = table.column(f"{position}:tag").to_numpy()
+    values = np.full(rows, None, dtype=object)
+    for tag in np.unique(tags):
+        if tag == _NONE:
+            continue
+        mask = tags == tag
+        column = table.column(f"{position}:{tag}").filter(pa.array(mask))
+        # to_pylist devolve os tipos Python originais (int, float, str, bool, datetime)
+        values[mask] = column.to_pylist() if tag != _STR else column.to_numpy(zero_copy_only=False)
+    return values
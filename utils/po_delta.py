@@ -0,0 +1,73 @@
+import hashlib
+
+import pandas as pd
+
+from utils.mongo_bulk import bulk_upsert, to_mongo_columns
+
+# Campo gravado em cada documento da collection 'po' com o hash das colunas de negócio
+HASH_FIELD = 'row_hash'
+
+# Separador que não aparece nos valores das exportações do SAP
+_FIELD_SEPARATOR = '\x1f'
+
+def row_hashes(df, key='unique'):
+    """Hash estável (blake2b, hex) de cada linha sobre todas as colunas exceto `key`.
+
+    O hash é calculado sobre os valores como são gravados no MongoDB (to_mongo_columns), com as colunas em
+    ordem alfabética, então não depende da ordem das colunas nem da versão do pandas. O tipo de cada valor
+    entra no hash (1 e '1' são diferentes), como no documento gravado.
+    """
+    columns = sorted(column for column in df.columns if column != key and column != HASH_FIELD)
+    converted = to_mongo_columns(df[columns])
+    texts = map(_FIELD_SEPARATOR.join, zip(*(map(repr, converted[column]) for column in columns)))
+    return pd.Series(
+        [hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest() for text in texts],
+        index=df.index, dtype=object,
+    )
+
+def load_stored_hashes(collection, key='unique', group='Purchasing Document'):
+    """{chave: (hash, grupo)} dos documentos da collection; documentos antigos sem hash têm hash None."""
+    stored = {}
+    cursor = collection.find({}, {key: 1, HASH_FIELD: 1, group: 1, '_id': 0}).batch_size(10000)
+    for document in cursor:
+        if document.get(key) is not None:
+            stored[document[key]] = (document.get(HASH_FIELD), document.get(group))
+    return stored
+
+def compute_delta(df, stored, key='unique', group='Purchasing Document'):
+    """Separa as linhas de `df` em novas, alteradas e inalteradas em relação a `stored` (load_stored_hashes).
+
+    Retorna um dict com os DataFrames 'novos' e 'alterados' (já com a coluna HASH_FIELD), as contagens
+    'inalterados' e 'ignorados' (sem chave ou repetidos) e a lista 'removidos'. `removidos` lista as chaves gravadas que não vieram na
+    exportação, só das POs (`group`) presentes nela: as exportações costumam ser filtradas, então POs
+    inteiras ausentes não indicam remoção.
+    """
+    valid = df[df[key].notna()].drop_duplicates(subset=key, keep='first')
+    hashes = row_hashes(valid, key)
+    valid = valid.assign(**{HASH_FIELD: hashes})
+
+    previous = valid[key].map(lambda value: stored.get(value, (None, None))[0])
+    exists = valid[key].map(stored.__contains__).astype(bool)
+    changed = exists & (previous != hashes)
+
+    keys = set(valid[key])
+    groups = set(to_mongo_columns(valid[[group]])[group]) if group in valid else set()
+    removed = sorted(
+        (stored_key for stored_key, (_, stored_group) in stored.items()
+         if stored_group in groups and stored_key not in keys),
+        key=str,
+    )
+    return {
+        'novos': valid[~exists],
+        'alterados': valid[changed],
+        'inalterados': int((exists & ~changed).sum()),
+        'removidos': removed,
+        'ignorados': len(df) - len(valid),
+    }
+
+def upsert_delta(collection, delta, key='unique', workers=4, progress=None):
+    """Grava só as linhas novas e alteradas de compute_delta (com o hash) via bulk_upsert; retorna o resumo."""
+    rows = pd.concat([delta['novos'], delta['alterados']])
+    if rows.empty:
+        return {'inseridos': 0, 'atualizados': 0, 'inalterados': 0, 'ignorados': 0}
+    return bulk_upsert(collection, rows, key=key, workers=workers, progress=progress)
@@ -0,0 +1,125 @@
+import io
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from importlib.util import find_spec
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Leitores de xlsx (engines do pd.read_excel):
+#   'calamine' - leitor em Rust (python-calamine), bem mais rápido nas exportações largas do SAP
+#   'openpyxl' - leitor em Python puro
+#   'auto'     - calamine se instalado, senão openpyxl
+EXCEL_ENGINES = ('auto', 'calamine', 'openpyxl')
+
+def resolve_engine(engine):
+    """Engine efetiva para a engine pedida; sem python-calamine, 'auto' e 'calamine' usam o openpyxl."""
+    if engine not in EXCEL_ENGINES:
+        raise ValueError(f"Engine Excel inválida: {engine!r} (opções: {', '.join(EXCEL_ENGINES)})")
+    if engine in ('auto', 'calamine'):
+        return 'calamine' if find_spec('python_calamine') is not None else 'openpyxl'
+    return engine
+
+def read_workbook(data, columns=None, engine='openpyxl'):
+    """Lê a primeira aba de um xlsx (bytes) com pd.read_excel, apenas com as colunas de `columns`.
+
+    Com `columns=None` todas as colunas são lidas.
+    """
+    usecols = None if columns is None else set(columns).__contains__
+    return pd.read_excel(io.BytesIO(data), engine=engine, usecols=usecols)
+
+def read_workbooks(files, columns=None, workers=1, engine='auto', progress=None, cache=None, prepare=None):
+    """Lê vários xlsx enviados (UploadedFile, arquivo ou bytes com `.name`), em paralelo quando `workers` > 1.
+
+    Arquivos que falham na leitura são registrados no log e ignorados, como no leitor anterior.
+    Com `cache` (utils.po_cache.WorkbookCache), planilhas já lidas vêm do Parquet em disco e as novas são
+    gravadas nele depois da leitura.
+    `prepare(df)` é aplicado a cada planilha no processo que a leu (ex.: po_schema.apply_po_schema); o
+    cache guarda o resultado já preparado.
+    `progress(arquivos_lidos, total, nome)` é chamado a cada arquivo concluído.
+    Retorna os DataFrames não vazios na ordem do upload.
+    """
+    engine = resolve_engine(engine)
+    files = list(files)
+    frames = [None] * len(files)
+    completed = 0
+
+    def done(position, frame, key=None):
+        nonlocal completed
+        completed += 1
+        name = getattr(files[position], 'name', '')
+        if frame is not None and not frame.empty:
+            frames[position] = frame
+            if key is not None:
+                _cache_safely(cache, key, frame, name)
+        if progress is not None:
+            progress(completed, len(files), name)
+
+    pending = []
+    for position, file in enumerate(files):
+        data = _file_bytes(file)
+        key = None
+        if cache is not None:
+            key = cache.key(data, columns, engine, _function_name(prepare))
+            frame = cache.get(key)
+            if frame is not None:
+                done(position, frame)
+                continue
+        pending.append((position, data, key))
+
+    if workers <= 1 or len(pending) <= 1:
+        for position, data, key in pending:
+            done(position, _read_safely(data, getattr(files[position], 'name', ''), columns, engine, prepare), key)
+    else:
+        # spawn evita herdar as threads do servidor do Streamlit via fork
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context) as executor:
+            futures = {
+                executor.submit(_read_safely, data, getattr(files[position], 'name', ''), columns, engine, prepare):
+                    (position, data, key)
+                for position, data, key in pending
+            }
+            broken = []
+            for future in as_completed(futures):
+                position, data, key = futures[future]
+                try:
+                    frame = future.result()
+                except BrokenProcessPool:
+                    broken.append((position, data, key))
+                    continue
+                done(position, frame, key)
+        if broken:
+            # Um processo do pool morreu (ex.: falta de memória com várias planilhas grandes ao mesmo tempo): as
+            # planilhas que estavam no pool são lidas de novo aqui, uma por vez
+            logger.warning(f"Reader pool terminated, re-reading {len(broken)} file(s) sequentially")
+            for position, data, key in sorted(broken, key=lambda item: item[0]):
+                done(position, _read_safely(data, getattr(files[position], 'name', ''), columns, engine, prepare), key)
+    return [frame for frame in frames if frame is not None]
+
+def _cache_safely(cache, key, frame, name):
+    try:
+        cache.put(key, frame)
+    except Exception as e:
+        # O cache é só um atalho: falhas de disco não impedem o processamento
+        logger.warning(f"Error caching file {name}: {str(e)}")
+
+def _read_safely(data, name, columns, engine, prepare=None):
+    try:
+        frame = read_workbook(data, columns, engine)
+        return frame if prepare is None else prepare(frame)
+    except Exception as e:
+        logger.error(f"Error reading file {name}: {str(e)}")
+        return None
+
+def _function_name(function):
+    return '' if function is None else f"{function.__module__}.{function.__qualname__}"
+
+def _file_bytes(file):
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if hasattr(file, "getvalue"):
+        return file.getvalue()
+    return file.read()
@@ -0,0 +1,41 @@
+import pandas as pd
+import polars as pl
+
+# Números de PO: começam com 4501-4506 e têm ao menos 10 dígitos; apenas os 10 primeiros são mantidos
+PO_PATTERN = r'450[1-6]\d{6}\d*'
+PO_LENGTH = 10
+
+# Elemento WBS X-XX-XXXXXX-XXX-XXXX-XXX: o grupo captura os 6 dígitos do código do projeto
+WBS_PATTERN = r'[A-Z0-9]-[A-Z0-9]{2}-(\d{6})-\d{3}-\d{4}-\d{3}'
+
+def _to_polars(text):
+    return pl.Series('text', text.fillna('').astype(str).tolist(), dtype=pl.Utf8)
+
+def extract_single_po(text):
+    """Para cada linha, retorna o número de PO quando o texto contém exatamente um PO distinto; caso contrário None.
+
+    Equivale a aplicar extract_numbers e manter apenas resultados com 10 caracteres, mas roda o regex
+    sobre a coluna inteira de uma vez.
+    """
+    frame = pl.DataFrame({'text': _to_polars(text)})
+    pos = frame.select(
+        pl.col('text')
+        .str.extract_all(PO_PATTERN)
+        .list.eval(pl.element().str.slice(0, PO_LENGTH))
+        .list.unique()
+        .alias('pos')
+    )
+    single = pos.select(
+        pl.when(pl.col('pos').list.len() == 1).then(pl.col('pos').list.first()).alias('po')
+    )
+    return pd.Series(single['po'].to_list(), index=text.index, dtype=object)
+
+def first_po_per_key(po, keys):
+    """Primeiro PO não vazio de cada chave, na ordem das linhas (ex.: por chaveNfe)."""
+    valid = po.notna() & (po != '')
+    return po[valid].groupby(keys[valid], sort=False).first()
+
+def extract_project_code(text):
+    """Código de projeto (6 dígitos do WBS) de cada linha como float; NaN quando não encontrado."""
+    codes = _to_polars(text).str.extract(WBS_PATTERN, 1)
+    return pd.Series(codes.cast(pl.Float64).to_numpy(), index=text.index)
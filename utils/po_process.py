@@ -0,0 +1,116 @@
+import pandas as pd
+import polars as pl
+import pyarrow as pa
+
+from utils.po_extract import WBS_PATTERN
+from utils.po_schema import DATE_COLUMNS
+
+# Colunas convertidas para número (texto inválido vira 0)
+NUMERIC_COLUMNS = ['Net order value', 'Order Quantity', 'PBXX Condition Amount']
+
+# Valores com uma coluna '<nome>_formatted' em reais
+CURRENCY_COLUMNS = [
+    'valor_unitario', 'valor_item_com_impostos', 'Net order value',
+    'total_valor_po_liquido', 'total_valor_po_com_impostos'
+]
+
+# Totais por PO: coluna de origem -> coluna do total
+PO_TOTALS = {
+    'Net order value': 'total_valor_po_liquido',
+    'valor_item_com_impostos': 'total_valor_po_com_impostos',
+    'Order Quantity': 'total_itens_po',
+}
+
+# Etapas informadas ao progress
+STAGES = ("Colunas preparadas", "Cálculos concluídos", "Resultado montado")
+
+def process_po(df, selected_columns, progress=None):
+    """Processamento das POs (DataProcessor.process_dataframe) em um único plano lazy do Polars.
+
+    Espera a planilha já tipada na leitura (po_schema.apply_po_schema): rodapés descartados, IDs Int64 e datas
+    datetime64. Deduplicação, contas, totais por PO (sum over), formatação em reais, código do projeto, datas
+    em texto e ordenação rodam no plano; o pandas só pega as linhas resultantes da planilha original.
+    Os totais somam na ordem do Polars e podem diferir do groupby do pandas na última casa binária; os valores
+    são arredondados para centavos (round(2), metade para longe do zero) antes da formatação.
+    `progress(etapa, total, texto)` é chamado ao fim de cada etapa.
+    """
+    def report(stage):
+        if progress is not None:
+            progress(stage + 1, len(STAGES), STAGES[stage])
+
+    columns = ['Purchasing Document', 'Item', 'Andritz WBS Element'] + \
+        [column for column in DATE_COLUMNS if column in selected_columns]
+    frame = pl.from_pandas(df[[column for column in columns if column in df.columns]].reset_index(drop=True))
+    frame = frame.with_columns(
+        pl.from_pandas(pd.to_numeric(df[column], errors='coerce')).cast(pl.Float64).alias(column)
+        for column in NUMERIC_COLUMNS
+    )
+    report(0)
+
+    result = _plan(frame.lazy(), 'Supplier' in df.columns, selected_columns).collect()
+    report(1)
+
+    rows = result['__row'].to_numpy()
+    computed = result.drop('__row').to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+    computed.index = rows
+    output = df.reset_index(drop=True).iloc[rows]
+    output.index = rows
+    output = output.assign(**{column: computed[column] for column in computed.columns})
+    report(2)
+    return output[[column for column in selected_columns if column in output.columns]]
+
+def _plan(frame, has_supplier, selected_columns):
+    names = frame.collect_schema().names()
+    net, quantity, tax = (pl.col(column).fill_nan(0).fill_null(0) for column in NUMERIC_COLUMNS)
+    po = pl.col('Purchasing Document')
+    # Mesmo texto do astype(str) do pandas: vazios viram '<NA>'
+    unique = pl.concat_str(
+        pl.col(column).cast(pl.Utf8).fill_null('<NA>') for column in ('Purchasing Document', 'Item')
+    )
+    code = pl.col('Andritz WBS Element').cast(pl.Utf8).str.extract(WBS_PATTERN, 1) \
+        if 'Andritz WBS Element' in names else pl.lit(None, dtype=pl.Utf8)
+    plan = (
+        frame.with_row_index('__row')
+        .with_columns(unique.alias('unique'))
+        .unique(subset=['unique'], keep='first', maintain_order=True)
+        .with_columns(
+            net, quantity, tax,
+            pl.when(quantity != 0).then(net / quantity).otherwise(0.0).alias('valor_unitario'),
+            (tax * quantity).alias('valor_item_com_impostos'),
+            code.cast(pl.Int64).alias('codigo_projeto'),
+            pl.col('Document Date').alias('PO Creation Date'),
+        )
+        .with_columns(
+            pl.col(column).sum().over(po).alias(total) for column, total in PO_TOTALS.items()
+        )
+        .with_columns(
+            _currency(pl.col(column)).alias(f'{column}_formatted') for column in CURRENCY_COLUMNS
+        )
+        .with_columns(
+            pl.col(column).dt.strftime('%d/%m/%Y') for column in DATE_COLUMNS
+            if column in names and column in selected_columns
+        )
+        .sort('PO Creation Date', descending=True, nulls_last=True, maintain_order=True)
+    )
+    if not has_supplier:
+        plan = plan.with_columns(pl.lit('').alias('Supplier'))
+    # Colunas de entrada que não mudam voltam da planilha original, com os tipos dela
+    return plan.drop('Purchasing Document', 'Item', 'Andritz WBS Element', strict=False)
+
+def _currency(value):
+    """'R$ 1.234,56' de valores arredondados para centavos; vazios e infinitos viram 'R$ 0,00'."""
+    cents = (value.round(2).abs() * 100).round(0).cast(pl.Int64, strict=False)
+    integer = cents // 100
+    # Separador de milhar: grupos de 3 dígitos contados da direita
+    digits = (
+        integer.cast(pl.Utf8)
+        .str.reverse().str.replace_all(r'(\d{3})', '$1.').str.strip_chars_end('.').str.reverse()
+    )
+    text = pl.concat_str([
+        pl.lit('R$ '),
+        pl.when((value < 0) & (cents > 0)).then(pl.lit('-')).otherwise(pl.lit('')),
+        digits,
+        pl.lit(','),
+        (cents % 100).cast(pl.Utf8).str.zfill(2),
+    ])
+    return pl.when(value.is_finite() & cents.is_not_null()).then(text).otherwise(pl.lit('R$ 0,00'))
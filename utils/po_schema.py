@@ -0,0 +1,96 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from utils.br_format import parse_date
+
+# Colunas de identificação: só os dígitos são mantidos, como inteiro (Int64)
+ID_COLUMNS = ['Purchasing Document', 'Item', 'Material']
+
+# Códigos lidos como texto (string); números da planilha viram o texto do inteiro (100123, não 100123.0)
+CODE_COLUMNS = ['Supplier', 'Control Code (NCM)', 'Cost Center', 'Project Code']
+
+# Textos com poucos valores distintos repetidos em todas as linhas
+CATEGORY_COLUMNS = ['Vendor Name', 'Plant', 'Purchasing Group', 'Order Unit', 'PO Created by']
+
+# Datas (datetime64); textos são lidos só nos formatos abaixo, na ordem
+DATE_COLUMNS = [
+    'Document Date', 'Delivery date', 'Last FUP',
+    'Stat.-Rel. Del. Date', 'Delivery Date',
+    'Requisition Date', 'Inspection Request Date',
+    'First Delivery Date', 'Purchase Requisition Delivery Date'
+]
+DATE_FORMATS = ('%d/%m/%Y', '%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S')
+
+def apply_po_schema(df):
+    """Aplica os tipos das POs a uma planilha lida (pd.read_excel), logo na leitura.
+
+    Linhas de rodapé do SAP (PO em texto, ex.: "Total") e linhas sem PO são descartadas; os IDs viram Int64,
+    os códigos string, os textos repetidos category e as datas datetime64. O índice é refeito (0..n-1).
+    """
+    if 'Purchasing Document' in df.columns:
+        po = df['Purchasing Document']
+        footer = np.fromiter((isinstance(value, str) for value in po), dtype=bool, count=len(po)) \
+            if po.dtype == object else np.zeros(len(po), dtype=bool)
+        df = df[~footer & po.notna().to_numpy()].reset_index(drop=True)
+    converted = {}
+    for column in df.columns:
+        if column in ID_COLUMNS:
+            converted[column] = _to_int64(df[column])
+        elif column in CODE_COLUMNS:
+            converted[column] = _to_code(df[column])
+        elif column in CATEGORY_COLUMNS:
+            converted[column] = df[column].astype('category')
+        elif column in DATE_COLUMNS:
+            converted[column] = _to_datetime(df[column])
+    return df.assign(**converted)
+
+def concat_po(frames):
+    """pd.concat das planilhas mantendo as colunas category (categorias diferentes viram object no concat)."""
+    df = pd.concat(frames, ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    return df
+
+def _to_int64(series):
+    """Int64: números inteiros como estão, textos só com os dígitos; o resto fica vazio (NA)."""
+    if pd.api.types.is_integer_dtype(series):
+        return series.astype('Int64')
+    if pd.api.types.is_float_dtype(series):
+        values = series.to_numpy()
+        integral = np.isfinite(values) & (values == np.floor(values)) & (np.abs(values) < 2 ** 63)
+        array = pd.arrays.IntegerArray(np.where(integral, values, 0).astype(np.int64), ~integral)
+    else:
+        array = pd.array([_id_value(value) for value in series], dtype='Int64')
+    return pd.Series(array, index=series.index)
+
+def _to_code(series):
+    """string: inteiros sem o '.0' do float; vazios como NA."""
+    if pd.api.types.is_float_dtype(series) or series.dtype == object:
+        values = series.map(_code_text, na_action='ignore')
+    else:
+        values = series
+    return values.astype('string')
+
+def _to_datetime(series):
+    return parse_date(series, DATE_FORMATS)
+
+def _id_value(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        value = int(value) if value.is_integer() else None
+    if isinstance(value, int):
+        return value if abs(value) < 2 ** 63 else None
+    if isinstance(value, str):
+        digits = re.sub(r'\D', '', value)
+        # Mais de 18 dígitos não cabe no Int64
+        return int(digits) if 0 < len(digits) <= 18 else None
+    return None
+
+def _code_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
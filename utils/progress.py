@@ -0,0 +1,88 @@
+import time
+
+def format_seconds(seconds):
+    """Duração curta legível: '42s' ou '3min 05s'."""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    return f"{seconds // 60}min {seconds % 60:02d}s"
+
+class StageProgress:
+    """Acompanha as etapas de um lote (leitura, enriquecimento, exportação): progresso, vazão, ETA e tempos.
+
+    `notify(fracao, texto)` recebe as atualizações (ex.: st.progress); chamadas são limitadas a uma a cada
+    `min_interval` segundos para não sobrecarregar a interface.
+    `rates` guarda a última vazão (unidades/s) de cada etapa, usada como estimativa (ETA) na próxima
+    execução; passe um dict da sessão (ex.: st.session_state) para mantê-la entre execuções do mesmo usuário.
+    """
+
+    def __init__(self, notify=None, min_interval=0.25, rates=None):
+        self.notify = notify
+        self.min_interval = min_interval
+        self.rates = {} if rates is None else rates
+        self.timings = []
+        self._name = None
+
+    def start(self, name, total=None, unit='linhas', steps=None):
+        """Inicia uma etapa; `total` é a quantidade de unidades a processar, se conhecida.
+
+        Etapas sem avanço contável (ex.: um collect do Polars) informam `steps`, o número de passos que
+        serão anunciados com step().
+        """
+        if self._name is not None:
+            self.finish()
+        self._name, self._total, self._unit, self._steps = name, total, unit, steps
+        self._start = self._last = time.perf_counter()
+        self._done, self._items, self._step = 0, None, 0
+        rate = self.rates.get(name)
+        eta = f" · ETA ~{format_seconds(total / rate)}" if total and rate else ""
+        self._send(0.0, f"{name}...{eta}")
+
+    def step(self, text):
+        """Anuncia o início de um passo da etapa atual; a barra avança pelos passos já concluídos."""
+        fraction = min(self._step / self._steps, 1.0) if self._steps else 0.0
+        self._step += 1
+        elapsed = format_seconds(time.perf_counter() - self._start)
+        self._send(fraction, f"{self._name}: {text} ({self._step}/{self._steps or '?'}) · {elapsed}")
+
+    def finish(self):
+        """Encerra a etapa atual e registra duração, quantidade e vazão."""
+        if self._name is None:
+            return
+        elapsed = time.perf_counter() - self._start
+        done = self._done or self._total or 0
+        self.timings.append({
+            'Etapa': self._name,
+            'Segundos': round(elapsed, 3),
+            'Quantidade': done,
+            'Unidade': self._unit,
+            'Por segundo': round(done / elapsed, 1) if elapsed > 0 else None,
+        })
+        if done and elapsed > 0:
+            self.rates[self._name] = done / elapsed
+        self._send(1.0, f"{self._name}: concluído em {format_seconds(elapsed)}")
+        self._name = None
+
+    def update(self, done, total=None, items=None):
+        """Informa o avanço da etapa atual (ex.: arquivos lidos e itens extraídos até agora)."""
+        if total:
+            self._total = total
+        self._done, self._items = done, items
+        now = time.perf_counter()
+        if now - self._last < self.min_interval and done != self._total:
+            return
+        self._last = now
+        elapsed = now - self._start
+        rate = done / elapsed if elapsed > 0 else 0
+        parts = [f"{self._name}: {done}" + (f"/{self._total}" if self._total else "") + f" {self._unit}"]
+        if items is not None:
+            parts.append(f"{items} itens")
+        parts.append(f"{rate:.0f} {self._unit}/s")
+        if self._total and rate:
+            parts.append(f"ETA {format_seconds((self._total - done) / rate)}")
+        fraction = min(done / self._total, 1.0) if self._total else 0.0
+        self._send(fraction, " · ".join(parts))
+
+    def _send(self, fraction, text):
+        if self.notify is not None:
+            self.notify(fraction, text)
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+def content_key(files, *extra):
+    """Chave do lote: hash do conteúdo (e nome) de cada arquivo enviado, mais valores extras (ex.: versão das
+    tabelas de referência). A ordem do upload faz parte da chave: a ordem das linhas do resultado segue a
+    dos arquivos."""
+    digests = [
+        hashlib.blake2b(file.getvalue(), digest_size=16).hexdigest() + ':' + getattr(file, 'name', '')
+        for file in files
+    ]
+    key = hashlib.blake2b(digest_size=16)
+    for part in digests + [repr(value) for value in extra]:
+        key.update(part.encode('utf-8'))
+        key.update(b'\0')
+    return key.hexdigest()
+
+def frame_fingerprint(frame):
+    """Assinatura barata de um DataFrame Polars (linhas, colunas e soma dos hashes das linhas)."""
+    if frame is None or frame.is_empty():
+        return (0, ())
+    return (frame.height, tuple(frame.columns), int(frame.hash_rows().sum()))
+
+def estimate_size(value):
+    """Tamanho aproximado em bytes de um resultado (DataFrames, bytes, arrays e índices de busca)."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(item) for item in value)
+    if hasattr(value, 'postings'):
+        return sum(rows.nbytes for rows in value.postings.values())
+    return 0
+
+class ResultCache:
+    """Cache LRU limitado pelo tamanho total (bytes) dos resultados guardados.
+
+    Pensado para ficar em st.cache_resource: é compartilhado entre reruns e sessões do mesmo processo.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        """Guarda `value`, descartando os resultados menos usados até caber no limite.
+
+        Resultados maiores que o limite inteiro não são guardados.
+        """
+        size = estimate_size(value) if size is None else size
+        with self._lock:
+            if key in self._entries:
+                self.total_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return False
+            while self._entries and self.total_bytes + size > self.max_bytes:
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self.total_bytes -= old_size
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
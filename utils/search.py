@@ -0,0 +1,94 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.text import ascii_lower
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Termos buscados guardados por índice (LRU); o índice é compartilhado entre sessões no cache de resultados
+TERM_CACHE_SIZE = 256
+
+def tokenize(text):
+    """Tokens normalizados (minúsculas, sem acentos, apenas letras e dígitos) de um texto."""
+    return _TOKEN.findall(ascii_lower(str(text)))
+
+class SearchIndex:
+    """Índice invertido token -> posições das linhas de um DataFrame, montado uma vez por lote.
+
+    A busca aceita vários termos (AND); cada termo casa com qualquer token que o contenha,
+    como o antigo filtro por substring, mas percorrendo apenas o vocabulário distinto.
+    """
+
+    def __init__(self, df):
+        self.size = len(df)
+        token_ids = {}
+        keys = []
+        for column in df.columns:
+            codes, uniques = pd.factorize(df[column], use_na_sentinel=True)
+            if not len(uniques):
+                continue
+            # Tokens de cada valor distinto (ids), achatados com offsets por valor
+            value_tokens = [[token_ids.setdefault(token, len(token_ids)) for token in set(tokenize(value))]
+                            for value in uniques]
+            lengths = np.fromiter((len(tokens) for tokens in value_tokens), dtype=np.int64, count=len(uniques))
+            flat = np.fromiter((tid for tokens in value_tokens for tid in tokens), dtype=np.int64,
+                               count=int(lengths.sum()))
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+            # Expande para as linhas: cada linha recebe os tokens do seu valor
+            rows = np.flatnonzero(codes >= 0)
+            per_row = lengths[codes[rows]]
+            total = int(per_row.sum())
+            if not total:
+                continue
+            row_rep = np.repeat(rows, per_row)
+            first = np.repeat(offsets[codes[rows]] - (np.cumsum(per_row) - per_row), per_row)
+            tok_rep = flat[first + np.arange(total)]
+            keys.append(tok_rep * self.size + row_rep)
+
+        # Pares (token, linha) únicos, ordenados por token e linha
+        keys = np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype=np.int64)
+        tokens = keys // max(self.size, 1)
+        rows = (keys % max(self.size, 1)).astype(np.int32)
+        bounds = np.flatnonzero(np.diff(tokens)) + 1
+        names = {tid: token for token, tid in token_ids.items()}
+        self.postings = {
+            names[int(group_tokens[0])]: group_rows
+            for group_tokens, group_rows in zip(np.split(tokens, bounds), np.split(rows, bounds))
+            if len(group_tokens)
+        }
+        self.vocabulary = sorted(self.postings)
+        self._term_cache = OrderedDict()
+        self._term_lock = threading.Lock()
+
+    def _rows_for_term(self, term):
+        """Posições das linhas que têm algum token contendo `term`."""
+        with self._term_lock:
+            rows = self._term_cache.get(term)
+            if rows is not None:
+                self._term_cache.move_to_end(term)
+                return rows
+        matches = [self.postings[token] for token in self.vocabulary if term in token]
+        rows = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int32)
+        with self._term_lock:
+            self._term_cache[term] = rows
+            while len(self._term_cache) > TERM_CACHE_SIZE:
+                self._term_cache.popitem(last=False)
+        return rows
+
+    def search(self, query):
+        """Posições (para iloc) das linhas que contêm todos os termos da busca."""
+        terms = tokenize(query)
+        if not terms:
+            return np.arange(self.size)
+        result = None
+        for term in sorted(set(terms), key=len, reverse=True):
+            rows = self._rows_for_term(term)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return result
@@ -0,0 +1,56 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Quantidade de textos distintos mantidos em cache no processo (compartilhado entre lotes e páginas)
+SLUG_CACHE_SIZE = 200_000
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+_HYPHENS = re.compile(r'-+')
+
+def ascii_lower(text):
+    """Minúsculas sem acentos (NFKD + ASCII), base do slug, das tags e do índice de busca."""
+    text = text.lower()
+    text = unicodedata.normalize('NFKD', text)
+    return text.encode('ascii', 'ignore').decode('utf-8')
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def slugify(text):
+    """
+    Convert a text string into a slug format.
+    - Convert to lowercase
+    - Remove special characters
+    - Replace spaces with hyphens
+    - Remove consecutive hyphens
+    """
+    if not isinstance(text, str):
+        text = str(text)
+    text = _NON_ALNUM.sub('-', ascii_lower(text))
+    text = text.strip('-')
+    return _HYPHENS.sub('-', text)
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def tag(text):
+    """Normaliza o texto como slugify, mas separa as palavras com espaços (coluna 'tags')."""
+    if not isinstance(text, str):
+        text = str(text)
+    text = _NON_ALNUM.sub('-', ascii_lower(text))
+    text = text.strip(' ')
+    return _HYPHENS.sub(' ', text)
+
+def _map_unique(series, func):
+    """Aplica `func` uma vez por valor distinto e replica o resultado para todas as linhas."""
+    codes, uniques = pd.factorize(series.astype(str))
+    normalized = np.array([func(value) for value in uniques], dtype=object)
+    return pd.Series(normalized[codes], index=series.index, dtype=object)
+
+def slugify_series(series):
+    """Versão de slugify para uma Series inteira."""
+    return _map_unique(series, slugify)
+
+def tag_series(series):
+    """Versão de tag para uma Series inteira."""
+    return _map_unique(series, tag)